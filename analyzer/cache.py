@@ -0,0 +1,326 @@
+"""Cache module for diagrams.
+
+This module provides an on-disk cache of the entities and relationships extracted from
+each source file, keyed by the content of the source.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import stat as stat_module
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from analyzer.entity import Entity
+
+# Name of the directory holding the caches of all projects, within the user's cache directory.
+CACHE_DIR_NAME = 'diagrams'
+
+# Bump when the cached representation changes so stale entries are ignored.
+CACHE_VERSION = 2
+
+# File mapping resolved source paths to the (mtime_ns, size, key) they had when last parsed.
+INDEX_FILE_NAME = 'index.json'
+
+# Index keys of files with nothing to cache: they define no entities, or cannot be parsed.
+# Neither is a hex digest, so they never name a cached extraction.
+EMPTY_KEY = ''
+SYNTAX_ERROR_KEY = 'syntax-error'
+
+_VERSION_TAG = f"{sys.version_info[:3]}:{CACHE_VERSION}"
+
+IndexEntry = Tuple[int, int, str]
+
+# The entities defined in a file and its (dependent, dependency) name pairs.
+Extraction = Tuple[List[Entity], List[Tuple[str, str]]]
+
+
+def user_cache_dir(project_dir: str) -> Path:
+    """
+    Get the directory caching the parsed files of a project.
+
+    Cache entries are unpickled, so they are kept in the user's own cache
+    directory ($XDG_CACHE_HOME, or ~/.cache) and never inside the scanned
+    project, whose contents are untrusted. Each project has its own directory,
+    named after the hash of its resolved path.
+
+    Args:
+        project_dir: The directory being scanned.
+
+    Returns:
+        The cache directory of the project.
+    """
+    base = os.environ.get('XDG_CACHE_HOME', '')
+    if not os.path.isabs(base):
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    project_key = hashlib.sha256(os.fsencode(os.path.realpath(project_dir))).hexdigest()
+    return Path(base, CACHE_DIR_NAME, project_key)
+
+
+def _is_index_entry(entry) -> bool:
+    """Check that a value read from the index file is an (mtime_ns, size, key) entry."""
+    return (isinstance(entry, list) and len(entry) == 3 and type(entry[0]) is int
+            and type(entry[1]) is int and isinstance(entry[2], str))
+
+
+class ParseCache:
+    """
+    A class to cache what was extracted from each source file on disk.
+
+    Entries are keyed by the SHA-256 of the source bytes together with the Python
+    version and the cache format version, so unchanged files skip parsing on
+    repeat runs. The extracted entities are cached rather than the AST, which
+    takes about as long to unpickle as to parse again. An index of file
+    modification times and sizes lets files that have not changed skip reading
+    and hashing as well, including files that define nothing or fail to parse,
+    which are indexed under sentinel keys. Entries no longer referenced by the
+    index are removed whenever it is saved.
+
+    The cache directory must only be writable by the user: entries are
+    unpickled, so whoever can write them can run code. See user_cache_dir.
+    """
+
+    def __init__(self, cache_dir: Path):
+        """
+        Initialize the ParseCache.
+
+        Args:
+            cache_dir: The directory to store cache entries in.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.index: Dict[str, IndexEntry] = self._load_index()
+        # Index entries of the files extracted since the index was last saved
+        self.seen: Dict[str, IndexEntry] = {}
+        # Resolved path of each directory sources were read from
+        self._resolved_dirs: Dict[str, str] = {}
+
+    def key(self, source: bytes) -> str:
+        """
+        Compute the cache key for some source code.
+
+        Args:
+            source: The raw bytes of the source file.
+
+        Returns:
+            The hex digest identifying the source.
+        """
+        digest = hashlib.sha256(source)
+        digest.update(_VERSION_TAG.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str, file_path: Path) -> Optional[Extraction]:
+        """
+        Load a cached extraction.
+
+        Any failure to load the entry counts as a miss, so a damaged entry is
+        simply extracted again.
+
+        Args:
+            key: The cache key of the source.
+            file_path: The path of the file being extracted, given to the
+                loaded entities (identical sources share an entry).
+
+        Returns:
+            The cached entities and relationships, or None if there is no usable entry.
+        """
+        try:
+            with open(self.cache_dir / f"{key}.pkl", 'rb') as f:
+                entities, edges = pickle.load(f)
+            if not isinstance(entities, list) or not isinstance(edges, list):
+                return None
+            for entity in entities:
+                entity.file_path = file_path
+        except Exception:
+            return None
+        return entities, edges
+
+    def put(self, key: str, extraction: Extraction):
+        """
+        Store an extraction in the cache. Failures to write are ignored.
+
+        Args:
+            key: The cache key of the source.
+            extraction: The entities and relationships extracted from the source.
+        """
+        try:
+            self._make_cache_dir()
+            self._write_atomic(f"{key}.pkl", pickle.dumps(extraction, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError:
+            pass
+
+    def parse_file(self, file_path: Path, extract: Callable[[bytes, Path], Extraction]) -> Extraction:
+        """
+        Extract a source file, skipping the read when its size and mtime are unchanged.
+
+        The file is recorded in seen; call save_index to persist it.
+
+        Args:
+            file_path: The path to the file to extract.
+            extract: Extracts the entities and relationships from the raw source
+                of a file, on a cache miss.
+
+        Returns:
+            The entities and relationships of the file.
+
+        Raises:
+            SyntaxError: If the source cannot be parsed, or could not be when
+                it was last read.
+        """
+        path_key, stat = self._resolve(file_path)
+        entry = self.index.get(path_key)
+        if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            if entry[2] == EMPTY_KEY:
+                self.seen[path_key] = entry
+                return [], []
+            if entry[2] == SYNTAX_ERROR_KEY:
+                self.seen[path_key] = entry
+                raise SyntaxError(f"{file_path} failed to parse when last read")
+            extraction = self.get(entry[2], file_path)
+            if extraction is not None:
+                self.seen[path_key] = entry
+                return extraction
+
+        with open(file_path, 'rb', buffering=0) as f:
+            source = f.read()
+        key = self.key(source)
+        extraction = self.get(key, file_path)
+        if extraction is None:
+            try:
+                extraction = extract(source, file_path)
+            except SyntaxError:
+                self.seen[path_key] = (stat.st_mtime_ns, stat.st_size, SYNTAX_ERROR_KEY)
+                raise
+            if extraction[0] or extraction[1]:
+                self.put(key, extraction)
+            else:
+                key = EMPTY_KEY
+
+        self.seen[path_key] = (stat.st_mtime_ns, stat.st_size, key)
+        return extraction
+
+    def _resolve(self, file_path: Path) -> Tuple[str, os.stat_result]:
+        """
+        Find the absolute path of a file with symbolic links resolved, and stat it.
+
+        Files are indexed by their resolved path, so the same file is found
+        whichever way the project directory was given. Each directory is only
+        resolved once; the file itself only needs resolving if it is a link.
+
+        Args:
+            file_path: The path to the file.
+
+        Returns:
+            A tuple (resolved path, stat result of the file).
+        """
+        stat = os.lstat(file_path)
+        if stat_module.S_ISLNK(stat.st_mode):
+            return os.path.realpath(file_path), os.stat(file_path)
+        directory, name = os.path.split(file_path)
+        resolved_dir = self._resolved_dirs.get(directory)
+        if resolved_dir is None:
+            resolved_dir = self._resolved_dirs[directory] = os.path.realpath(directory)
+        return os.path.join(resolved_dir, name), stat
+
+    def take_seen(self) -> Dict[str, IndexEntry]:
+        """
+        Return and clear the index entries of the files extracted since the last call.
+
+        Returns:
+            A dictionary of path to (mtime_ns, size, key) entries.
+        """
+        seen, self.seen = self.seen, {}
+        return seen
+
+    def merge_seen(self, seen: Dict[str, IndexEntry]):
+        """
+        Add the index entries of files extracted by another process.
+
+        Args:
+            seen: A dictionary of path to (mtime_ns, size, key) entries.
+        """
+        self.seen.update(seen)
+
+    def save_index(self, prune: bool = False):
+        """
+        Write the index to disk if it has changed, then remove the entries it no
+        longer refers to. Failures to write are ignored.
+
+        Args:
+            prune: Whether the files extracted since the last save make up the
+                whole project, so files that were not seen (deleted, renamed or
+                no longer scanned) are dropped from the index.
+        """
+        index = self.seen if prune else {**self.index, **self.seen}
+        if index != self.index:
+            try:
+                self._make_cache_dir()
+                data = json.dumps({'version': _VERSION_TAG, 'files': index}).encode()
+                self._write_atomic(INDEX_FILE_NAME, data)
+            except OSError:
+                return
+            self.index = index
+            self._evict_unreferenced()
+        self.seen = {}
+
+    def _evict_unreferenced(self):
+        """Delete the cached extractions that no indexed file refers to."""
+        referenced = {f"{entry[2]}.pkl" for entry in self.index.values()}
+        try:
+            with os.scandir(self.cache_dir) as it:
+                stale = [entry.path for entry in it
+                         if entry.name.endswith('.pkl') and entry.name not in referenced]
+        except OSError:
+            return
+        for path in stale:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _make_cache_dir(self):
+        """Create the cache directory, readable and writable by the user only."""
+        self.cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    def _load_index(self) -> Dict[str, IndexEntry]:
+        """
+        Read the index from disk.
+
+        Returns:
+            The stored index, or an empty one if it is missing, unreadable or
+            was written by another Python or cache version. Malformed entries
+            are left out.
+        """
+        try:
+            with open(self.cache_dir / INDEX_FILE_NAME, 'rb') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != _VERSION_TAG:
+            return {}
+        files = data.get('files')
+        if not isinstance(files, dict):
+            return {}
+        return {path: tuple(entry) for path, entry in files.items() if _is_index_entry(entry)}
+
+    def _write_atomic(self, name: str, data: bytes):
+        """
+        Write a file in the cache directory so readers never see partial contents.
+
+        Args:
+            name: The file name within the cache directory.
+            data: The bytes to write.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_dir / name)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
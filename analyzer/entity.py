@@ -3,6 +3,7 @@
 This module provides the Entity class, representing a code entity (class or function).
 """
 
+import sys
 from pathlib import Path
 from typing import Set
 
@@ -15,6 +16,8 @@ class Entity:
     type, file path, and relationships with other entities.
     """
 
+    __slots__ = ('name', 'type', 'file_path', 'line_number', 'dependencies', 'used_by')
+
     def __init__(self, name: str, entity_type: str, file_path: Path, line_number: int):
         """
         Initialize an Entity.
@@ -25,7 +28,7 @@ class Entity:
             file_path: The path to the file containing the entity.
             line_number: The line number where the entity is defined.
         """
-        self.name = name
+        self.name = sys.intern(name)
         self.type = entity_type
         self.file_path = file_path
         self.line_number = line_number
@@ -39,7 +42,7 @@ class Entity:
         Args:
             entity_name: The name of the entity this entity depends on.
         """
-        self.dependencies.add(entity_name)
+        self.dependencies.add(sys.intern(entity_name))
 
     def add_used_by(self, entity_name: str):
         """
@@ -48,7 +51,24 @@ class Entity:
         Args:
             entity_name: The name of the entity that uses this entity.
         """
-        self.used_by.add(entity_name)
+        self.used_by.add(sys.intern(entity_name))
+
+    def __setstate__(self, state):
+        """
+        Restore an unpickled entity, interning its names again.
+
+        Entities parsed in worker processes are unpickled in the parent, where
+        strings are no longer interned.
+
+        Args:
+            state: The pickled state, a (None, slot values) pair.
+        """
+        _, slots = state
+        for attribute, value in slots.items():
+            setattr(self, attribute, value)
+        self.name = sys.intern(self.name)
+        self.dependencies = {sys.intern(name) for name in self.dependencies}
+        self.used_by = {sys.intern(name) for name in self.used_by}
 
     def __str__(self) -> str:
         """Return a string representation of the entity."""
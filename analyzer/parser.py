@@ -4,11 +4,196 @@ This module provides functionality to parse Python code and extract entities and
 """
 
 import ast
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Tuple
 
+from analyzer.cache import Extraction, IndexEntry, ParseCache
 from analyzer.entity import Entity
 
+# Below this many files the cost of starting worker processes outweighs the parsing work.
+MIN_FILES_FOR_POOL = 32
+
+
+def extract_file(file_path: Path, cache: Optional[ParseCache] = None) -> Extraction:
+    """
+    Parse a Python file and extract its entities and candidate relationships.
+
+    This function does not depend on any parser state, so it can run in a worker
+    process. Relationships are returned as (source, target) name pairs and are
+    only resolved against the known entities once all files have been parsed.
+
+    Args:
+        file_path: The path to the file to parse.
+        cache: An optional cache to look up and store the extraction in.
+
+    Returns:
+        A tuple (entities, edges) where edges are (dependent, dependency) pairs.
+    """
+    try:
+        if cache is not None:
+            return cache.parse_file(file_path, extract_source)
+        # Read raw bytes unbuffered: ast.parse decodes them itself (honouring any
+        # coding cookie), and FileIO.readall sizes its single read from fstat.
+        with open(file_path, 'rb', buffering=0) as f:
+            source = f.read()
+        return extract_source(source, file_path)
+    except SyntaxError:
+        print(f"Syntax error in {file_path}, skipping")
+        return [], []
+
+
+def extract_source(source: bytes, file_path: Path) -> Extraction:
+    """
+    Extract the entities and candidate relationships from the source of a file.
+
+    Args:
+        source: The raw bytes of the source file.
+        file_path: The path to the file, recorded on its entities.
+
+    Returns:
+        A tuple (entities, edges) where edges are (dependent, dependency) pairs.
+
+    Raises:
+        SyntaxError: If the source cannot be parsed.
+    """
+    if not _may_define_entities(source):
+        return [], []
+    collector = _Collector(file_path)
+    collector.visit(ast.parse(source, filename=str(file_path)))
+    return collector.entities, collector.edges
+
+
+def _may_define_entities(source: bytes) -> bool:
+    """
+    Cheaply check whether source code could define a class or function.
+
+    Relationships are only recorded inside classes and functions, so a file
+    without either keyword contributes nothing and need not be parsed.
+
+    Args:
+        source: The raw bytes of the source file.
+
+    Returns:
+        False if the file certainly defines no entities.
+    """
+    return b'def' in source or b'class' in source
+
+
+# Cache handed to each worker process once, instead of with every task.
+_worker_cache: Optional[ParseCache] = None
+
+
+def _init_worker(cache: Optional[ParseCache]):
+    """Store the parser's cache in a freshly started worker process."""
+    global _worker_cache
+    _worker_cache = cache
+
+
+def _extract_in_worker(file_path: Path) -> Tuple[Extraction, Dict[str, IndexEntry]]:
+    """Run extract_file in a worker, returning its result and the file's cache index entry."""
+    result = extract_file(file_path, _worker_cache)
+    seen = _worker_cache.take_seen() if _worker_cache is not None else {}
+    return result, seen
+
+
+class _Collector:
+    """
+    A single-pass AST traversal collecting the entities and relationships of a file.
+
+    Nodes are visited depth-first from an explicit stack rather than by recursion.
+    Each stack item carries the name of the entity owning the node, so the owner
+    of a call is known without parent links, and whether the node sits directly
+    in a class body, which makes a function a method owned by that class.
+    """
+
+    def __init__(self, file_path: Path):
+        """
+        Initialize the _Collector.
+
+        Args:
+            file_path: The path to the file being visited.
+        """
+        self.file_path = file_path
+        self.entities: List[Entity] = []
+        self.edges: List[Tuple[str, str]] = []
+
+    def visit(self, tree: ast.AST):
+        """
+        Collect entities and relationships from a tree.
+
+        Args:
+            tree: The AST to traverse.
+        """
+        file_path = self.file_path
+        entities = self.entities
+        edges = self.edges
+        # (node, owning entity name, name of the class whose body directly contains node)
+        stack: List[Tuple[ast.AST, Optional[str], Optional[str]]] = [(tree, None, None)]
+
+        while stack:
+            node, owner, member_of = stack.pop()
+            node_type = node.__class__
+
+            if node_type is ast.ClassDef:
+                entity = Entity(node.name, 'class', file_path, node.lineno)
+                entities.append(entity)
+
+                # Extract base classes as dependencies
+                for base in node.bases:
+                    if base.__class__ is ast.Name:
+                        entity.add_dependency(base.id)
+
+                owner = node.name
+                self._push_children(stack, node, owner, node.body)
+                continue
+
+            if node_type is ast.FunctionDef:
+                if member_of is not None:
+                    if node.name == '__init__':
+                        # This is a constructor, check for type hints in parameters
+                        for arg in node.args.args[1:]:  # Skip 'self'
+                            if arg.annotation and arg.annotation.__class__ is ast.Name:
+                                # Add dependency from the class to the type hint
+                                edges.append((member_of, arg.annotation.id))
+                    owner = member_of
+                else:
+                    entities.append(Entity(node.name, 'function', file_path, node.lineno))
+                    owner = node.name
+
+            elif node_type is ast.Call:
+                if owner is not None and node.func.__class__ is ast.Name:
+                    edges.append((owner, node.func.id))
+
+            self._push_children(stack, node, owner, None)
+
+    @staticmethod
+    def _push_children(stack: List[Tuple[ast.AST, Optional[str], Optional[str]]], node: ast.AST,
+                       owner: Optional[str], class_body: Optional[List[ast.stmt]]):
+        """
+        Push the children of a node so they are popped in source order.
+
+        Args:
+            stack: The traversal stack.
+            node: The node whose children to push.
+            owner: The name of the entity owning the children.
+            class_body: The body list of a ClassDef node, whose statements are
+                marked as members of the class.
+        """
+        children = []
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if value.__class__ is list:
+                member_of = owner if value is class_body else None
+                for item in value:
+                    if isinstance(item, ast.AST):
+                        children.append((item, owner, member_of))
+            elif isinstance(value, ast.AST):
+                children.append((value, owner, None))
+        children.reverse()
+        stack.extend(children)
+
 
 class CodeParser:
     """
@@ -18,9 +203,18 @@ class CodeParser:
     functions, and their relationships.
     """
 
-    def __init__(self):
-        """Initialize the CodeParser."""
+    def __init__(self, max_workers: Optional[int] = None, cache_dir: Optional[Path] = None):
+        """
+        Initialize the CodeParser.
+
+        Args:
+            max_workers: The number of worker processes used by parse_files
+                (defaults to the number of CPUs).
+            cache_dir: The directory to cache extracted files in (no caching if None).
+        """
         self.entities: Dict[str, Entity] = {}
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache = ParseCache(cache_dir) if cache_dir is not None else None
 
     def parse_file(self, file_path: Path):
         """
@@ -29,97 +223,74 @@ class CodeParser:
         Args:
             file_path: The path to the file to parse.
         """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            try:
-                tree = ast.parse(f.read(), filename=str(file_path))
-            except SyntaxError:
-                print(f"Syntax error in {file_path}, skipping")
-                return
-
-        # Add parent references to AST nodes
-        for node in ast.walk(tree):
-            for child in ast.iter_child_nodes(node):
-                child.parent = node
-
-        # Extract classes and functions
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                entity = Entity(node.name, 'class', file_path, node.lineno)
-                self.entities[node.name] = entity
+        entities, edges = extract_file(file_path, self.cache)
+        self._add_entities(entities)
+        self._link(edges)
+        if self.cache is not None:
+            self.cache.save_index()
 
-                # Extract base classes as dependencies
-                for base in node.bases:
-                    if isinstance(base, ast.Name):
-                        entity.add_dependency(base.id)
+    def parse_files(self, file_paths: List[Path]):
+        """
+        Parse multiple Python files.
 
-            elif isinstance(node, ast.FunctionDef):
-                # Check if this is a method in a class
-                parent_is_class = False
-                parent_class = None
-                try:
-                    parent_is_class = isinstance(node.parent, ast.ClassDef)
-                    if parent_is_class:
-                        parent_class = node.parent
-                except AttributeError:
-                    # If parent attribute doesn't exist, assume it's not a method
-                    pass
-
-                if parent_is_class and node.name == '__init__':
-                    # This is a constructor, check for type hints in parameters
-                    for arg in node.args.args[1:]:  # Skip 'self'
-                        if arg.annotation and isinstance(arg.annotation, ast.Name):
-                            # Add dependency from the class to the type hint
-                            if parent_class.name in self.entities and arg.annotation.id in self.entities:
-                                self.entities[parent_class.name].add_dependency(arg.annotation.id)
-                                self.entities[arg.annotation.id].add_used_by(parent_class.name)
-
-                if not parent_is_class:
-                    entity = Entity(node.name, 'function', file_path, node.lineno)
-                    self.entities[node.name] = entity
-
-        # Extract relationships
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Call):
-                if isinstance(node.func, ast.Name):
-                    # Function call
-                    if node.func.id in self.entities:
-                        # Find the parent entity
-                        parent = self._find_parent_entity(node)
-                        if parent and parent.name in self.entities:
-                            self.entities[parent.name].add_dependency(node.func.id)
-                            self.entities[node.func.id].add_used_by(parent.name)
-
-    def _find_parent_entity(self, node: Any) -> Optional[Any]:
-        """
-        Find the parent entity (class or function) of a node.
+        Files are parsed in worker processes when there are enough of them, and
+        relationships are resolved once all entities are known, so references
+        to entities defined in other files are kept regardless of file order.
+        With a cache, the files are taken to be the whole project: files indexed
+        by an earlier run but missing from the list are dropped from the index.
 
         Args:
-            node: The AST node to find the parent for.
-
-        Returns:
-            The parent ClassDef or FunctionDef node, or None if not found.
-            If a FunctionDef is found that is a method of a class, returns the ClassDef.
-        """
-        parent = getattr(node, 'parent', None)
-        while parent:
-            if isinstance(parent, ast.ClassDef):
-                return parent
-            elif isinstance(parent, ast.FunctionDef):
-                # Check if this function is a method of a class
-                method_parent = getattr(parent, 'parent', None)
-                if method_parent and isinstance(method_parent, ast.ClassDef):
-                    return method_parent
-                return parent
-            parent = getattr(parent, 'parent', None)
-
-        return None
+            file_paths: A list of paths to the files to parse.
+        """
+        if self.max_workers > 1 and len(file_paths) >= MIN_FILES_FOR_POOL:
+            chunksize = max(1, len(file_paths) // (self.max_workers * 4))
+            results = []
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                     initargs=(self.cache,)) as executor:
+                for result, seen in executor.map(_extract_in_worker, file_paths,
+                                                 chunksize=chunksize):
+                    results.append(result)
+                    if seen:
+                        self.cache.merge_seen(seen)
+        else:
+            results = [extract_file(file_path, self.cache) for file_path in file_paths]
 
-    def parse_files(self, file_paths: List[Path]):
+        if self.cache is not None:
+            self.cache.save_index(prune=True)
+
+        all_edges: List[Tuple[str, str]] = []
+        for entities, edges in results:
+            self._add_entities(entities)
+            all_edges.extend(edges)
+        self._link(all_edges)
+
+    def _add_entities(self, entities: List[Entity]):
         """
-        Parse multiple Python files.
+        Register entities, replacing earlier entities with the same name.
 
         Args:
-            file_paths: A list of paths to the files to parse.
+            entities: The entities to register.
+        """
+        for entity in entities:
+            self.entities[entity.name] = entity
+
+    def _link(self, edges: List[Tuple[str, str]]):
+        """
+        Record relationships between known entities.
+
+        Relationship sets store the entities' own name objects rather than the
+        names found at the call sites, so each name is held once no matter how
+        many relationships refer to it (names returned by worker processes are
+        otherwise separate copies).
+
+        Args:
+            edges: (dependent, dependency) name pairs; pairs referring to unknown
+                entities are ignored.
         """
-        for file_path in file_paths:
-            self.parse_file(file_path)
+        entities = self.entities
+        for source, target in edges:
+            source_entity = entities.get(source)
+            target_entity = entities.get(target)
+            if source_entity is not None and target_entity is not None:
+                source_entity.add_dependency(target_entity.name)
+                target_entity.add_used_by(source_entity.name)
@@ -1,15 +1,67 @@
-from typing import Optional
+import importlib
+import sys
+from typing import Dict, Optional, Type
 
+from analyzer.cache import user_cache_dir
+from analyzer.entity import Entity
 from analyzer.parser import CodeParser
 from analyzer.scanner import FileScanner
 from constants import GeneratorType
-from generator.text_generator import TextGenerator
-from generator.mermaid_generator import MermaidDiagramGenerator
-from generator.ascii_generator import ASCIIDiagramGenerator 
+from generator.base import DiagramGenerator
+
+# Generators are imported on first use so a run only loads the backend it needs.
+_GENERATORS = {
+    GeneratorType.Text: ('generator.text_generator', 'TextGenerator'),
+    GeneratorType.Mermaid: ('generator.mermaid_generator', 'MermaidDiagramGenerator'),
+    GeneratorType.ASCII: ('generator.ascii_generator', 'ASCIIDiagramGenerator'),
+}
+
+
+def get_generator_class(format_type: str) -> Type[DiagramGenerator]:
+    """
+    Resolve the generator class for an output format.
+
+    Args:
+        format_type: The format of the diagram ('text', 'mermaid', or 'ascii').
+
+    Returns:
+        The DiagramGenerator subclass producing that format.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    try:
+        module_name, class_name = _GENERATORS[GeneratorType(format_type)]
+    except ValueError:
+        raise ValueError(f"Unsupported format: {format_type}") from None
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def load_entities(directory: str, cache: bool = True) -> Dict[str, Entity]:
+    """
+    Scan a directory and parse its Python files.
+
+    Args:
+        directory: The directory to scan for Python files.
+        cache: Whether to reuse and store parse results in the user's cache
+            directory (see analyzer.cache.user_cache_dir).
+
+    Returns:
+        A dictionary of the entities found, by name.
+    """
+    # Scan for Python files
+    scanner = FileScanner()
+    python_files = scanner.scan_directory(directory)
+
+    # Parse the files
+    parser = CodeParser(cache_dir=user_cache_dir(directory) if cache else None)
+    parser.parse_files(python_files)
+    return parser.entities
 
 
 def generate_diagram(directory: str, entity: str, format_type: str = 'text',
-                    depth: int = 1, output: Optional[str] = None):
+                    depth: int = 1, output: Optional[str] = None,
+                    entities: Optional[Dict[str, Entity]] = None, cache: bool = True):
     """
     Generate a diagram for a specific entity.
 
@@ -19,30 +71,22 @@ def generate_diagram(directory: str, entity: str, format_type: str = 'text',
         format_type: The format of the diagram ('text', 'mermaid', or 'ascii').
         depth: The maximum depth of dependencies to include.
         output: The output file path (if None, prints to stdout).
+        entities: The entities already loaded from the directory, if any, so a
+            session drawing several diagrams only parses it once.
+        cache: Whether to use the parse cache when loading the entities.
     """
-    # Scan for Python files
-    scanner = FileScanner()
-    python_files = scanner.scan_directory(directory)
+    generator_cls = get_generator_class(format_type)
 
-    # Parse the files
-    parser = CodeParser()
-    parser.parse_files(python_files)
+    if entities is None:
+        entities = load_entities(directory, cache)
 
     # Generate the diagram
-    if format_type == GeneratorType.Text:
-        generator = TextGenerator(parser.entities)
-    elif format_type == GeneratorType.Mermaid:
-        generator = MermaidDiagramGenerator(parser.entities)
-    elif format_type == GeneratorType.ASCII:
-        generator = ASCIIDiagramGenerator(parser.entities)
-    else:
-        raise ValueError(f"Unsupported format: {format_type}")
-
-    diagram = generator.generate(entity, depth)
+    generator = generator_cls(entities)
 
-    # Output the diagram
+    # Write the diagram straight to its destination
     if output:
         with open(output, 'w', encoding='utf-8') as f:
-            f.write(diagram)
+            generator.generate_into(f, entity, depth)
     else:
-        print(diagram)
\ No newline at end of file
+        generator.generate_into(sys.stdout, entity, depth)
+        sys.stdout.write("\n")
\ No newline at end of file
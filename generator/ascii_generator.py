@@ -5,10 +5,14 @@ showing entity relationships.
 """
 
 import collections
+import sys
 from typing import List, Set, Tuple, Dict, Deque
 
 from generator.base import DiagramGenerator, Entity
 
+# Blank cells kept around the boxes; arrows never reach more than one cell outside them.
+CANVAS_MARGIN = 2
+
 
 class ASCIIDiagramGenerator(DiagramGenerator):
     """
@@ -25,122 +29,131 @@ class ASCIIDiagramGenerator(DiagramGenerator):
             'connector': 'o',
             'arrow_left': '<', 'arrow_right': '>', 'arrow_up': '^', 'arrow_down': 'v'
         }
-        self.grid: Dict[Tuple[int, int], str] = {}
-        self.min_x: int = 0
-        self.min_y: int = 0
-        self.max_x: int = 0
-        self.max_y: int = 0
-
-    def _draw_box(self, entity_name: str, entity_type: str, x_coord: int, y_coord: int) -> Tuple[int, int]:
-        """Draws an ASCII box for an entity on the grid at (x_coord, y_coord).
+        # Replacement for each existing character a line segment crosses; characters
+        # missing from the table (boxes, arrow heads, '+', parallel lines) are kept.
+        self._horizontal_merge = {
+            ' ': self.char_map['horizontal'], self.char_map['vertical']: self.char_map['top_left'],
+        }
+        self._vertical_merge = {
+            ' ': self.char_map['vertical'], self.char_map['horizontal']: self.char_map['top_left'],
+        }
+        # Flat row-major canvas of single characters covering the layout plus a margin
+        self.canvas: List[str] = []
+        self.origin_x: int = 0
+        self.origin_y: int = 0
+        self.width: int = 0
+        self.height: int = 0
+        # Layout state of the last generate() call, kept so repeated calls reuse the containers
+        self._all_nodes: Set[str] = set()
+        # Edges as adjacency sets: source -> the targets it depends on
+        self._edges: Dict[str, Set[str]] = collections.defaultdict(set)
+        self._reverse_edges: Dict[str, List[str]] = collections.defaultdict(list)
+        self._node_levels: Dict[str, int] = {}
+        self._levels: Dict[int, List[str]] = collections.defaultdict(list)
+        self._entity_positions: Dict[str, Tuple[int, int, int, int]] = {}
+        self._box_texts: Dict[str, str] = {}
+        self._max_widths_at_level: Dict[int, int] = collections.defaultdict(int)
+        self._level_x_coords: Dict[int, int] = {}
+
+    def _blit_box(self, content_text: str, x_coord: int, y_coord: int) -> Tuple[int, int]:
+        """Writes a box around a line of text onto the canvas, one row slice at a time.
 
         Args:
-            entity_name: Name of the entity.
-            entity_type: Type of the entity.
+            content_text: The text inside the box.
             x_coord: Top-left x-coordinate of the box.
             y_coord: Top-left y-coordinate of the box.
 
         Returns:
             A tuple (width, height) of the drawn box.
         """
-        content_text = f" {entity_name} ({entity_type}) "
-        content_width = len(content_text)
-        
-        box_width = content_width + 2 # 1 char for left border, 1 for right
-        box_height = 3 # Top border, content, bottom border
-
-        # Top border
-        self._set_char(x_coord, y_coord, self.char_map['top_left'])
-        for i in range(content_width):
-            self._set_char(x_coord + 1 + i, y_coord, self.char_map['horizontal'])
-        self._set_char(x_coord + content_width + 1, y_coord, self.char_map['top_right'])
-
-        # Middle row (content)
-        self._set_char(x_coord, y_coord + 1, self.char_map['vertical'])
-        for i, char_content in enumerate(content_text):
-            self._set_char(x_coord + 1 + i, y_coord + 1, char_content)
-        self._set_char(x_coord + content_width + 1, y_coord + 1, self.char_map['vertical'])
-
-        # Bottom border
-        self._set_char(x_coord, y_coord + 2, self.char_map['bottom_left'])
-        for i in range(content_width):
-            self._set_char(x_coord + 1 + i, y_coord + 2, self.char_map['horizontal'])
-        self._set_char(x_coord + content_width + 1, y_coord + 2, self.char_map['bottom_right'])
-        
+        rows = self._box_rows(content_text)
+        box_width = len(rows[0])
+        box_height = len(rows)
+
+        offset = (y_coord - self.origin_y) * self.width + (x_coord - self.origin_x)
+        for row in rows:
+            self.canvas[offset:offset + box_width] = row
+            offset += self.width
+
         return box_width, box_height
 
-    def _collect_dependencies_recursive(self, source_entity_name: str, current_depth: int,
-                                        all_nodes: Set[str], all_edges: Set[Tuple[str, str]],
-                                        visited_paths: Set[Tuple[str, str]]):
-        """Recursively collects dependencies for an entity."""
-        if current_depth <= 0 or source_entity_name not in self.entities:
-            return
+    def _box_rows(self, content_text: str) -> Tuple[str, str, str]:
+        """Returns the top border, content and bottom border rows of a box around a line of text."""
+        char_map = self.char_map
+        border = char_map['horizontal'] * len(content_text)
+        return (char_map['top_left'] + border + char_map['top_right'],
+                char_map['vertical'] + content_text + char_map['vertical'],
+                char_map['bottom_left'] + border + char_map['bottom_right'])
 
-        all_nodes.add(source_entity_name)
-        entity = self.entities[source_entity_name]
+    def _collect_related(self, entity_name: str, depth: int, attribute: str,
+                         all_nodes: Set[str], edges: Dict[str, Set[str]]):
+        """Collects the entities within `depth` steps of an entity, breadth-first.
 
-        for dep_name in entity.dependencies:
-            if dep_name not in self.entities: # Check if dependency exists in our known entities
-                continue
-            
-            if (source_entity_name, dep_name) in visited_paths:
-                continue  # Already processed this path
-
-            visited_paths.add((source_entity_name, dep_name))
-            all_nodes.add(dep_name)
-            all_edges.add((source_entity_name, dep_name))
-            self._collect_dependencies_recursive(dep_name, current_depth - 1, all_nodes, all_edges, visited_paths)
-
-    def _collect_callers_recursive(self, target_entity_name: str, current_depth: int,
-                                   all_nodes: Set[str], all_edges: Set[Tuple[str, str]],
-                                   visited_paths: Set[Tuple[str, str]]):
-        """Recursively collects callers (used_by) for an entity."""
-        if current_depth <= 0 or target_entity_name not in self.entities:
+        Args:
+            entity_name: Name of the entity to start from.
+            depth: The maximum number of steps to follow.
+            attribute: 'dependencies' to follow dependencies or 'used_by' to follow callers.
+            all_nodes: Set receiving the names of the entities reached.
+            edges: Adjacency sets receiving, for each source, the targets it depends on.
+        """
+        entities = self.entities
+        callers = attribute == 'used_by'
+        if depth <= 0:
             return
+        distances = {entity_name: 0}
+        queue: Deque[str] = collections.deque([entity_name])
+
+        while queue:
+            name = queue.popleft()
+            next_distance = distances[name] + 1
+            for neighbor in getattr(entities[name], attribute):
+                if neighbor not in entities: # Check if the entity is known
+                    continue
+                all_nodes.add(neighbor)
+                if callers:
+                    edges[neighbor].add(name)
+                else:
+                    edges[name].add(neighbor)
+                if neighbor not in distances:
+                    distances[neighbor] = next_distance
+                    if next_distance < depth: # Nodes at the depth limit are never expanded
+                        queue.append(neighbor)
+
+    def _init_canvas(self, entity_positions: Dict[str, Tuple[int, int, int, int]]):
+        """Allocates a blank canvas large enough for the boxes and the arrows between them.
 
-        all_nodes.add(target_entity_name)
-        entity = self.entities[target_entity_name]
-
-        for caller_name in entity.used_by:
-            if caller_name not in self.entities: # Check if caller exists
-                continue
-            
-            if (caller_name, target_entity_name) in visited_paths:
-                continue  # Already processed this path
-            
-            visited_paths.add((caller_name, target_entity_name))
-            all_nodes.add(caller_name)
-            all_edges.add((caller_name, target_entity_name))
-            self._collect_callers_recursive(caller_name, current_depth - 1, all_nodes, all_edges, visited_paths)
+        Args:
+            entity_positions: (x, y, width, height) of every box to be drawn.
+        """
+        margin = CANVAS_MARGIN
+        boxes = entity_positions.values()
+        self.origin_x = min(x for x, _, _, _ in boxes) - margin
+        self.origin_y = min(y for _, y, _, _ in boxes) - margin
+        self.width = max(x + w for x, _, w, _ in boxes) + margin - self.origin_x
+        self.height = max(y + h for _, y, _, h in boxes) + margin - self.origin_y
+        self.canvas = [' '] * (self.width * self.height)
 
     def _set_char(self, x: int, y: int, char: str):
-        """Sets a character at the specified position in the grid."""
-        self.grid[(x, y)] = char
-        # Update bounds. Assumes grid and bounds are reset in generate().
-        if len(self.grid) == 1: # First character placed after grid reset
-            self.min_x = x
-            self.max_x = x + 1
-            self.min_y = y
-            self.max_y = y + 1
-        else:
-            self.min_x = min(self.min_x, x)
-            self.max_x = max(self.max_x, x + 1)
-            self.min_y = min(self.min_y, y)
-            self.max_y = max(self.max_y, y + 1)
+        """Sets a character at the specified position on the canvas."""
+        self.canvas[(y - self.origin_y) * self.width + (x - self.origin_x)] = char
+
+    def _get_char(self, x: int, y: int) -> str:
+        """Returns the character at the specified position on the canvas."""
+        return self.canvas[(y - self.origin_y) * self.width + (x - self.origin_x)]
 
     def _render_grid(self) -> str:
-        """Renders the grid content into a string."""
-        if not self.grid:
+        """Renders the canvas into a string, trimmed to the cells that were drawn on."""
+        width = self.width
+        rows = ["".join(self.canvas[i:i + width]) for i in range(0, len(self.canvas), width)]
+        # Every drawn character is visible except spaces inside boxes, so trimming
+        # blank outer rows and columns leaves exactly the drawn area.
+        drawn = [i for i, row in enumerate(rows) if not row.isspace()]
+        if not drawn:
             return "(Empty Diagram - Grid is empty)"
-
-        output_lines = []
-        # Iterate from min_x to max_x-1 and min_y to max_y-1
-        for y_coord in range(self.min_y, self.max_y):
-            line_chars = []
-            for x_coord in range(self.min_x, self.max_x):
-                line_chars.append(self.grid.get((x_coord, y_coord), ' ')) # Default to space
-            output_lines.append("".join(line_chars))
-        return "\n".join(output_lines)
+        rows = rows[drawn[0]:drawn[-1] + 1]
+        left = min(len(row) - len(row.lstrip(' ')) for row in rows if not row.isspace())
+        right = max(len(row.rstrip(' ')) for row in rows)
+        return "\n".join(row[left:right] for row in rows)
 
     def generate(self, entity_name: str, depth: int = 1) -> str:
         """
@@ -154,24 +167,36 @@ class ASCIIDiagramGenerator(DiagramGenerator):
         Returns:
             The generated ASCII diagram as a string.
         """
-        if entity_name not in self.entities:
+        # Entity names are interned, so an interned name finds them by identity
+        entity_name = sys.intern(entity_name)
+        entity = self.entities.get(entity_name)
+        if entity is None:
             return f"Entity '{entity_name}' not found"
 
-        # Reset grid for new diagram generation
-        self.grid = {}
-        self.min_x, self.min_y, self.max_x, self.max_y = 0, 0, 0, 0
+        if depth <= 0 or (not entity.dependencies and not entity.used_by):
+            # An entity shown without relationships is drawn as its box alone, with no layout to compute
+            box = "\n".join(self._box_rows(f" {entity.name} ({entity.type}) "))
+            return self._format_diagram(entity_name, depth, box)
+
+        # Layout containers are reused across calls and only cleared here
+        all_nodes = self._all_nodes
+        edges = self._edges
+        node_levels = self._node_levels
+        reverse = self._reverse_edges
+        levels = self._levels
+        entity_positions = self._entity_positions
+        box_texts = self._box_texts
+        max_widths_at_level = self._max_widths_at_level
+        level_x_coords = self._level_x_coords
+        for container in (all_nodes, edges, node_levels, reverse, levels, entity_positions,
+                          box_texts, max_widths_at_level, level_x_coords):
+            container.clear()
 
-        all_nodes: Set[str] = set()
-        all_edges: Set[Tuple[str, str]] = set()
-        visited_paths: Set[Tuple[str, str]] = set()
-        
         # Collect all relevant nodes and edges
         # Start with the main entity to ensure it's included if isolated
         all_nodes.add(entity_name)
-        self._collect_dependencies_recursive(entity_name, depth, all_nodes, all_edges, visited_paths)
-        # Reset visited_paths for caller collection if you want to allow paths through entity_name again
-        # For a unified graph, keeping visited_paths might be okay.
-        self._collect_callers_recursive(entity_name, depth, all_nodes, all_edges, visited_paths)
+        self._collect_related(entity_name, depth, 'dependencies', all_nodes, edges)
+        self._collect_related(entity_name, depth, 'used_by', all_nodes, edges)
 
 
         if not all_nodes:
@@ -182,88 +207,67 @@ class ASCIIDiagramGenerator(DiagramGenerator):
         #    - Main entity (entity_name) is at level 0.
         #    - Dependencies are at positive levels (1, 2, ...).
         #    - Callers are at negative levels (-1, -2, ...).
-        node_levels: Dict[str, int] = {}
         
+        # Reverse adjacency lists, so each caller BFS step only looks at the edges of the current node
+        for s, targets in edges.items():
+            for t in targets:
+                reverse[t].append(s)
+
         # BFS for dependencies (positive levels)
-        q_dep: Deque[Tuple[str, int]] = collections.deque()
-        if entity_name in all_nodes: # Ensure entity_name is part of the graph to start BFS
-            q_dep.append((entity_name, 0))
-        
+        q_dep: Deque[Tuple[str, int]] = collections.deque([(entity_name, 0)])
         visited_bfs_dep = {entity_name: 0} # Store node and its level
         node_levels[entity_name] = 0
 
         while q_dep:
             curr, level = q_dep.popleft()
-            if abs(level) >= depth and curr != entity_name : # Check depth limit
-                 continue
-            for s, t in all_edges:
-                if s == curr: # t is a dependency of curr
-                    new_level = level + 1
-                    if t in all_nodes and (t not in visited_bfs_dep or new_level < visited_bfs_dep[t]):
-                        node_levels[t] = new_level
-                        visited_bfs_dep[t] = new_level
-                        if abs(new_level) < depth or (abs(new_level) == depth and t == entity_name): # Allow full depth
-                           q_dep.append((t, new_level))
-        
-        # BFS for callers (negative levels)
-        q_caller: Deque[Tuple[str, int]] = collections.deque()
-        if entity_name in all_nodes:
-            q_caller.append((entity_name, 0))
+            new_level = level + 1
+            for t in edges.get(curr, ()): # t is a dependency of curr
+                if t not in visited_bfs_dep: # BFS reaches each node first at its closest level
+                    node_levels[t] = new_level
+                    visited_bfs_dep[t] = new_level
+                    if new_level < depth: # Only nodes below the depth limit are expanded
+                        q_dep.append((t, new_level))
 
+        # BFS for callers (negative levels)
+        q_caller: Deque[Tuple[str, int]] = collections.deque([(entity_name, 0)])
         visited_bfs_caller = {entity_name: 0} # Store node and its level
-        # node_levels[entity_name] = 0 # Already set
 
         while q_caller:
             curr, level = q_caller.popleft()
-            if abs(level) >= depth and curr != entity_name: # Check depth limit
-                continue
-            for s, t in all_edges:
-                if t == curr: # s is a caller of curr
-                    new_level = level - 1
-                    if s in all_nodes and (s not in visited_bfs_caller or abs(new_level) < abs(visited_bfs_caller[s])): # Ensure we get the "closest" layer
-                        node_levels[s] = new_level
-                        visited_bfs_caller[s] = new_level
-                        if abs(new_level) < depth or (abs(new_level) == depth and s == entity_name): # Allow full depth
-                            q_caller.append((s, new_level))
-        
-        # Ensure all nodes in all_nodes have a level, default to 0 if somehow missed (e.g. isolated nodes not entity_name)
-        for node in all_nodes:
-            if node not in node_levels:
-                node_levels[node] = 0 # Fallback, though ideally all nodes are reached
+            new_level = level - 1
+            for s in reverse.get(curr, ()): # s is a caller of curr
+                if s not in visited_bfs_caller: # BFS reaches each node first at its closest layer
+                    node_levels[s] = new_level
+                    visited_bfs_caller[s] = new_level
+                    if -new_level < depth:
+                        q_caller.append((s, new_level))
 
         # --- Organize Nodes by Level ---
-        levels: Dict[int, List[str]] = collections.defaultdict(list)
-        for node, lvl in node_levels.items():
-            if node in all_nodes: # Only consider nodes that were collected
-                 levels[lvl].append(node)
-        for lvl in levels:
-            levels[lvl].sort() # Sort nodes within each level for consistent output
+        # Nodes are bucketed in name order, so each level's list is already sorted
+        # for consistent output. Nodes somehow missed by the BFS (e.g. isolated
+        # nodes other than entity_name) fall back to level 0.
+        sorted_nodes = sorted(all_nodes)
+        for node in sorted_nodes:
+            levels[node_levels.setdefault(node, 0)].append(node)
 
         # --- Calculate Positions ---
-        entity_positions: Dict[str, Tuple[int, int, int, int]] = {}
-        box_dimensions: Dict[str, Tuple[int, int]] = {}
-        max_widths_at_level: Dict[int, int] = collections.defaultdict(int)
-        
         X_SPACING = 10  # Increased spacing for clarity
         Y_SPACING = 2
         
-        # First pass: Calculate all box dimensions and max widths
-        for node_name_calc in all_nodes:
-            entity_obj = self.entities.get(node_name_calc)
-            name_display = entity_obj.name if entity_obj else node_name_calc
-            type_display = entity_obj.type if entity_obj else "Unknown"
-            
-            # Calculate box size (similar to _draw_box but without drawing)
-            content_text = f" {name_display} ({type_display}) "
-            content_width = len(content_text)
-            box_w = content_width + 2
-            box_h = 3
-            box_dimensions[node_name_calc] = (box_w, box_h)
-            
-            level_of_node = node_levels.get(node_name_calc, 0) # Default to level 0 if not found
-            max_widths_at_level[level_of_node] = max(max_widths_at_level[level_of_node], box_w)
+        # First pass: Build the text of every box, once, and the widest box of each level
+        entities = self.entities
+        for level_idx_calc, level_nodes in levels.items():
+            widest = 0
+            for node_name_calc in level_nodes:
+                entity_obj = entities.get(node_name_calc)
+                if entity_obj:
+                    content_text = f" {entity_obj.name} ({entity_obj.type}) "
+                else: # Placeholder for entities not in self.entities
+                    content_text = f" {node_name_calc} (details not found) "
+                box_texts[node_name_calc] = content_text
+                widest = max(widest, len(content_text) + 2)
+            max_widths_at_level[level_idx_calc] = widest
 
-        level_x_coords: Dict[int, int] = {}
         current_x_coord = 1
         sorted_level_indices = sorted(levels.keys())
 
@@ -271,85 +275,62 @@ class ASCIIDiagramGenerator(DiagramGenerator):
             level_x_coords[level_idx_calc] = current_x_coord
             current_x_coord += max_widths_at_level[level_idx_calc] + X_SPACING
             
-        # Second pass: Assign final positions and draw boxes
+        # Second pass: Assign final positions
+        box_h = 3
         for level_idx_draw in sorted_level_indices:
             current_y_coord = 1
             x_pos_for_level = level_x_coords[level_idx_draw]
             for node_name_draw in levels[level_idx_draw]:
-                box_w_draw, box_h_draw = box_dimensions[node_name_draw]
-                entity_obj_draw = self.entities.get(node_name_draw)
-
-                if entity_obj_draw:
-                    self._draw_box(entity_obj_draw.name, entity_obj_draw.type, x_pos_for_level, current_y_coord)
-                else: # Draw placeholder for entities not in self.entities
-                    placeholder_text = f" {node_name_draw} (details not found) "
-                    content_width = len(placeholder_text)
-                    # Recalculate box_w_draw for placeholder as it might differ
-                    box_w_draw = content_width + 2 
-                    # Manual placeholder drawing
-                    self._set_char(x_pos_for_level, current_y_coord, self.char_map['top_left'])
-                    for i in range(content_width):
-                        self._set_char(x_pos_for_level + 1 + i, current_y_coord, self.char_map['horizontal'])
-                    self._set_char(x_pos_for_level + content_width + 1, current_y_coord, self.char_map['top_right'])
-                    self._set_char(x_pos_for_level, current_y_coord + 1, self.char_map['vertical'])
-                    for i, char_content in enumerate(placeholder_text):
-                        self._set_char(x_pos_for_level + 1 + i, current_y_coord + 1, char_content)
-                    self._set_char(x_pos_for_level + content_width + 1, current_y_coord + 1, self.char_map['vertical'])
-                    self._set_char(x_pos_for_level, current_y_coord + 2, self.char_map['bottom_left'])
-                    for i in range(content_width):
-                        self._set_char(x_pos_for_level + 1 + i, current_y_coord + 2, self.char_map['horizontal'])
-                    self._set_char(x_pos_for_level + content_width + 1, current_y_coord + 2, self.char_map['bottom_right'])
-
-
-                entity_positions[node_name_draw] = (x_pos_for_level, current_y_coord, box_w_draw, box_h_draw)
-                current_y_coord += box_h_draw + Y_SPACING
-        
+                box_w = len(box_texts[node_name_draw]) + 2
+                entity_positions[node_name_draw] = (x_pos_for_level, current_y_coord, box_w, box_h)
+                current_y_coord += box_h + Y_SPACING
+
+        # Draw boxes
+        self._init_canvas(entity_positions)
+        for node_name_draw, (x_pos, y_pos, _, _) in entity_positions.items():
+            self._blit_box(box_texts[node_name_draw], x_pos, y_pos)
+
         # Draw connections
-        for source_node, target_node in sorted(list(all_edges)): # Sort for consistent arrow drawing order
-            if source_node in entity_positions and target_node in entity_positions:
-                source_pos_dims = entity_positions[source_node]
-                target_pos_dims = entity_positions[target_node]
-                self._draw_arrow(source_pos_dims, target_pos_dims)
+        # Arrows are drawn in (source, target) name order for consistent output; every
+        # edge endpoint was collected, so all of them have positions.
+        for source_node in sorted_nodes:
+            targets = edges.get(source_node)
+            if not targets:
+                continue
+            source_pos_dims = entity_positions[source_node]
+            for target_node in sorted(targets):
+                self._draw_arrow(source_pos_dims, entity_positions[target_node])
+
+        return self._format_diagram(entity_name, depth, self._render_grid())
 
+    @staticmethod
+    def _format_diagram(entity_name: str, depth: int, diagram_content: str) -> str:
+        """Adds the title of the diagram above its drawing."""
         diagram_header = f"ASCII Diagram for {entity_name} (depth {depth}):"
-        diagram_content = self._render_grid()
         return f"{diagram_header}\n{'=' * len(diagram_header)}\n\n{diagram_content}"
 
     def _draw_horizontal_segment(self, x1: int, y: int, x2: int, check_collision: bool = True):
         """Draws a horizontal line segment, optionally checking for collisions."""
-        start_x, end_x = min(x1, x2), max(x1, x2)
-        for x_coord in range(start_x, end_x + 1):
-            existing_char = self.grid.get((x_coord, y), ' ')
-            
-            if check_collision and existing_char != ' ':
-                if existing_char == self.char_map['vertical']:
-                    self._set_char(x_coord, y, self.char_map['top_left'])  # Form '+'
-                elif existing_char == self.char_map['horizontal']:
-                    pass # Already '-', do nothing
-                elif existing_char == self.char_map['top_left']: # Is '+'
-                    pass # Already '+', do nothing
-                else: # Box char or arrow head
-                    continue # Skip drawing this point
-            else: # Empty cell
-                self._set_char(x_coord, y, self.char_map['horizontal'])
+        start = (y - self.origin_y) * self.width + (min(x1, x2) - self.origin_x)
+        end = start + abs(x2 - x1) + 1
+        if check_collision:
+            # Empty cells become '-', crossed '|' become '+', anything else is kept
+            merge = self._horizontal_merge
+            self.canvas[start:end] = [merge.get(c, c) for c in self.canvas[start:end]]
+        else:
+            self.canvas[start:end] = self.char_map['horizontal'] * (end - start)
 
     def _draw_vertical_segment(self, x: int, y1: int, y2: int, check_collision: bool = True):
         """Draws a vertical line segment, optionally checking for collisions."""
-        start_y, end_y = min(y1, y2), max(y1, y2)
-        for y_coord in range(start_y, end_y + 1):
-            existing_char = self.grid.get((x, y_coord), ' ')
-
-            if check_collision and existing_char != ' ':
-                if existing_char == self.char_map['horizontal']:
-                    self._set_char(x, y_coord, self.char_map['top_left'])  # Form '+'
-                elif existing_char == self.char_map['vertical']:
-                    pass # Already '|', do nothing
-                elif existing_char == self.char_map['top_left']: # Is '+'
-                    pass # Already '+', do nothing
-                else: # Box char or arrow head
-                    continue # Skip drawing this point
-            else: # Empty cell
-                self._set_char(x, y_coord, self.char_map['vertical'])
+        width = self.width
+        start = (min(y1, y2) - self.origin_y) * width + (x - self.origin_x)
+        end = start + abs(y2 - y1) * width + 1
+        if check_collision:
+            # Empty cells become '|', crossed '-' become '+', anything else is kept
+            merge = self._vertical_merge
+            self.canvas[start:end:width] = [merge.get(c, c) for c in self.canvas[start:end:width]]
+        else:
+            self.canvas[start:end:width] = self.char_map['vertical'] * (abs(y2 - y1) + 1)
 
     def _draw_arrow(self,
                     source_pos_dims: Tuple[int, int, int, int],
@@ -365,28 +346,16 @@ class ASCIIDiagramGenerator(DiagramGenerator):
         dx = t_center_x - s_center_x
         dy = t_center_y - s_center_y
         
-        # Define exit/entry points on box edges
-        # For simplicity, connect to middle of sides.
-        s_exit_pts = {
-            'right': (sx + sw -1 , sy + sh // 2), 
-            'left': (sx, sy + sh // 2),
-            'bottom': (sx + sw // 2, sy + sh -1), 
-            'top': (sx + sw // 2, sy)
-        }
-        t_entry_pts = {
-            'right': (tx + tw -1, ty + th // 2), 
-            'left': (tx, ty + th // 2),
-            'bottom': (tx + tw // 2, ty + th-1), 
-            'top': (tx + tw // 2, ty) 
-        }
+        # Exit/entry points are on box edges; for simplicity, connect to middle of sides.
+        # Only the pair used by the chosen route is computed.
 
         off = 1 # Offset for drawing lines just outside the box
 
         # Prefer H-V-H for horizontal dominant, V-H-V for vertical dominant
         if abs(dx) >= abs(dy):  # Primarily horizontal connection
             if dx > 0:  # Target is to the right
-                start_x, start_y = s_exit_pts['right']
-                end_x, end_y = t_entry_pts['left']
+                start_x, start_y = sx + sw - 1, sy + sh // 2 # Right side of source
+                end_x, end_y = tx, ty + th // 2 # Left side of target
                 arrow_char = self.char_map['arrow_right']
                 mid_x = (start_x + end_x) // 2
                 
@@ -398,8 +367,8 @@ class ASCIIDiagramGenerator(DiagramGenerator):
                 self._set_char(end_x - off, end_y, arrow_char) # Place arrow before box edge
 
             else:  # Target is to the left
-                start_x, start_y = s_exit_pts['left']
-                end_x, end_y = t_entry_pts['right']
+                start_x, start_y = sx, sy + sh // 2 # Left side of source
+                end_x, end_y = tx + tw - 1, ty + th // 2 # Right side of target
                 arrow_char = self.char_map['arrow_left']
                 mid_x = (start_x + end_x) // 2
 
@@ -412,8 +381,8 @@ class ASCIIDiagramGenerator(DiagramGenerator):
 
         else:  # Primarily vertical connection
             if dy > 0:  # Target is below
-                start_x, start_y = s_exit_pts['bottom']
-                end_x, end_y = t_entry_pts['top']
+                start_x, start_y = sx + sw // 2, sy + sh - 1 # Bottom side of source
+                end_x, end_y = tx + tw // 2, ty # Top side of target
                 arrow_char = self.char_map['arrow_down']
                 mid_y = (start_y + end_y) // 2
                 
@@ -425,8 +394,8 @@ class ASCIIDiagramGenerator(DiagramGenerator):
                 self._set_char(end_x, end_y - off, arrow_char)
 
             else:  # Target is above
-                start_x, start_y = s_exit_pts['top']
-                end_x, end_y = t_entry_pts['bottom']
+                start_x, start_y = sx + sw // 2, sy # Top side of source
+                end_x, end_y = tx + tw // 2, ty + th - 1 # Bottom side of target
                 arrow_char = self.char_map['arrow_up']
                 mid_y = (start_y + end_y) // 2
 
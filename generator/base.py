@@ -3,7 +3,7 @@
 This module provides the base class for all diagram generators.
 """
 
-from typing import Dict
+from typing import Dict, TextIO
 
 from analyzer.entity import Entity
 
@@ -24,6 +24,23 @@ class DiagramGenerator:
         """
         self.entities = entities
 
+    @property
+    def entities(self) -> Dict[str, Entity]:
+        """The entities to include in diagrams."""
+        return self._entities
+
+    @entities.setter
+    def entities(self, entities: Dict[str, Entity]):
+        self._entities = entities
+        self._reset_caches()
+
+    def _reset_caches(self):
+        """
+        Drop anything cached from the entities across generate() calls.
+
+        Called whenever the generator is given a different set of entities.
+        """
+
     def generate(self, entity_name: str, depth: int = 1) -> str:
         """
         Generate a diagram for a specific entity.
@@ -36,3 +53,17 @@ class DiagramGenerator:
             The generated diagram as a string.
         """
         raise NotImplementedError("Subclasses must implement generate()")
+
+    def generate_into(self, out: TextIO, entity_name: str, depth: int = 1):
+        """
+        Generate a diagram for a specific entity and write it to a stream.
+
+        Subclasses that produce their output incrementally can override this to
+        write it as it is generated instead of building the whole string first.
+
+        Args:
+            out: The text stream to write the diagram to.
+            entity_name: The name of the entity to generate a diagram for.
+            depth: The maximum depth of dependencies to include.
+        """
+        out.write(self.generate(entity_name, depth))
@@ -4,10 +4,44 @@ This module provides the MermaidDiagramGenerator class, which generates Mermaid
 showing entity relationships.
 """
 
-from typing import List, Set, Tuple
+import io
+import sys
+from collections import deque
+from typing import Dict, Set, TextIO, Tuple
 
+from analyzer.entity import Entity
 from generator.base import DiagramGenerator
 
+# Opening of every diagram: the code fence, graph direction and node style classes.
+_MERMAID_HEADER = (
+    "```mermaid\n"
+    "graph TD\n"
+    "    classDef classNode fill:#f9f,stroke:#333,stroke-width:2px,color:#000\n"
+    "    classDef functionNode fill:#9cf,stroke:#333,stroke-width:2px,color:#000\n"
+    "    classDef defaultNode fill:#lightgrey,stroke:#333,stroke-width:2px,color:#000\n"
+)
+
+# Line declaring an edge, formatted from a (source, target) tuple.
+_EDGE_LINE = "    %s --> %s\n"
+
+# Mermaid style class and node shape delimiters for each entity type.
+_STYLE_TABLE = {
+    "class": ("classNode", "[[", "]]"),
+    "function": ("functionNode", "((", "))"), # e.g., stadium shape for functions
+}
+_DEFAULT_STYLE = ("defaultNode", "(", ")")
+
+
+def _node_template(style: Tuple[str, str, str]) -> str:
+    """Bake a node style into a format string taking the node id."""
+    style_class, shape_start, shape_end = style
+    return f"    {{id}}{shape_start}{{id}}{shape_end}:::{style_class}\n"
+
+
+# Node definition line templates for each entity type.
+_NODE_TEMPLATES = {entity_type: _node_template(style) for entity_type, style in _STYLE_TABLE.items()}
+_DEFAULT_NODE_TEMPLATE = _node_template(_DEFAULT_STYLE)
+
 
 class MermaidDiagramGenerator(DiagramGenerator):
     """
@@ -16,6 +50,10 @@ class MermaidDiagramGenerator(DiagramGenerator):
     This class generates Mermaid markdown diagrams showing entity relationships.
     """
 
+    def _reset_caches(self):
+        # Node definition lines are cached across generate() calls
+        self._node_line_cache: Dict[str, str] = {}
+
     def generate(self, entity_name: str, depth: int = 1) -> str:
         """
         Generate a Mermaid diagram for a specific entity.
@@ -27,103 +65,140 @@ class MermaidDiagramGenerator(DiagramGenerator):
         Returns:
             The generated Mermaid diagram as a string.
         """
-        if entity_name not in self.entities:
-            return f"Entity '{entity_name}' not found"
-
-        lines = [
-            "```mermaid",
-            "graph TD",
-            "    classDef classNode fill:#f9f,stroke:#333,stroke-width:2px,color:#000",
-            "    classDef functionNode fill:#9cf,stroke:#333,stroke-width:2px,color:#000",
-            "    classDef defaultNode fill:#lightgrey,stroke:#333,stroke-width:2px,color:#000"
-        ]
+        out = io.StringIO()
+        self.generate_into(out, entity_name, depth)
+        return out.getvalue()
+
+    def generate_into(self, out: TextIO, entity_name: str, depth: int = 1):
+        """
+        Generate a Mermaid diagram for a specific entity, writing each line as it is produced.
+
+        Args:
+            out: The text stream to write the diagram to.
+            entity_name: The name of the entity to generate a diagram for.
+            depth: The maximum depth of dependencies to include.
+        """
+        # Match the interned entity names by identity in every lookup below
+        entity_name = sys.intern(entity_name)
+        entity = self.entities.get(entity_name)
+        if entity is None:
+            out.write(f"Entity '{entity_name}' not found")
+            return
+
+        out.write(_MERMAID_HEADER)
         
         defined_nodes = set()
         
         # Define main entity and ensure it's processed first
-        self._define_node_if_not_exists(lines, entity_name, defined_nodes)
-
-        # Add dependencies
-        visited_edges = set()
-        self._add_dependencies(lines, entity_name, depth, visited_edges, defined_nodes)
+        self._define_node_if_not_exists(out, entity_name, defined_nodes)
 
-        # Add entities that use this entity
-        self._add_used_by(lines, entity_name, depth, visited_edges, defined_nodes)
+        if depth == 1:
+            self._write_direct_relationships(out, entity_name, entity, defined_nodes)
+        elif depth > 0 and (entity.dependencies or entity.used_by):
+            # Add dependencies
+            expanded = self._walk(out, entity_name, depth, 'dependencies', defined_nodes, set())
 
-        lines.append("```")
-        return "\n".join(lines)
+            # Add entities that use this entity
+            self._walk(out, entity_name, depth, 'used_by', defined_nodes, expanded)
 
-    def _get_node_style_and_shape(self, entity_type: str) -> Tuple[str, str, str]:
-        if entity_type == "class":
-            return "classNode", "[[", "]]"
-        elif entity_type == "function": # Assuming 'function' type
-            return "functionNode", "((", "))" # e.g., stadium shape for functions
-        # Add more types here if needed
-        else: # Default
-            return "defaultNode", "(", ")"
+        out.write("```")
 
-    def _define_node_if_not_exists(self, lines: List[str], entity_id: str, defined_nodes: Set[str]):
-        if entity_id in defined_nodes or entity_id not in self.entities:
+    def _define_node_if_not_exists(self, out: TextIO, entity_id: str, defined_nodes: Set[str]):
+        if entity_id in defined_nodes:
             return
 
-        entity = self.entities[entity_id]
-        style_class, shape_start, shape_end = self._get_node_style_and_shape(entity.type)
-        
-        lines.append(f"    {entity_id}{shape_start}{entity_id}{shape_end}:::{style_class}")
+        # Only known entities are cached, so a hit needs no further lookup
+        node_line = self._node_line_cache.get(entity_id)
+        if node_line is None:
+            entity = self.entities.get(entity_id)
+            if entity is None:
+                return
+            node_line = _NODE_TEMPLATES.get(entity.type, _DEFAULT_NODE_TEMPLATE).format(id=entity_id)
+            self._node_line_cache[entity_id] = node_line
+
+        out.write(node_line)
         defined_nodes.add(entity_id)
 
-    def _add_dependencies(self, lines: List[str], entity_name: str, max_depth: int, 
-                         visited_edges: Set[Tuple[str, str]], defined_nodes: Set[str]):
+    def _write_direct_relationships(self, out: TextIO, entity_name: str, entity: Entity,
+                                    defined_nodes: Set[str]):
         """
-        Add dependencies to the diagram.
+        Add the direct dependencies and users of an entity to the diagram.
+
+        This is what the walks produce for a depth of 1, without their queues and
+        visited sets. Only the entity's own dependency edges have been drawn, so the
+        only user edge to skip is an entity using itself.
 
         Args:
-            lines: The list of lines to add to.
-            entity_name: The name of the entity to add dependencies for.
-            max_depth: The maximum depth of dependencies to include.
-            visited_edges: A set of already visited entity pairs (edges) to avoid cycles.
+            out: The stream to write diagram lines to.
+            entity_name: The name of the entity.
+            entity: The entity.
             defined_nodes: A set of entity IDs that have already been defined in the diagram.
         """
-        if max_depth <= 0 or entity_name not in self.entities:
-            return
-
-        self._define_node_if_not_exists(lines, entity_name, defined_nodes)
-
-        entity = self.entities[entity_name]
-
-        for dep_name in entity.dependencies:
-            if dep_name in self.entities:
-                self._define_node_if_not_exists(lines, dep_name, defined_nodes)
-
-                if (entity_name, dep_name) not in visited_edges:
-                    visited_edges.add((entity_name, dep_name))
-                    lines.append(f"    {entity_name} --> {dep_name}")
-                    self._add_dependencies(lines, dep_name, max_depth - 1, visited_edges, defined_nodes)
-
-    def _add_used_by(self, lines: List[str], entity_name: str, max_depth: int, 
-                    visited_edges: Set[Tuple[str, str]], defined_nodes: Set[str]):
+        entities = self.entities
+        write = out.write
+        for dependency in entity.dependencies:
+            if dependency in entities:
+                self._define_node_if_not_exists(out, dependency, defined_nodes)
+                write(_EDGE_LINE % (entity_name, dependency))
+        for user in entity.used_by:
+            if user not in entities:
+                continue
+            self._define_node_if_not_exists(out, user, defined_nodes)
+            if user != entity_name or entity_name not in entity.dependencies:
+                write(_EDGE_LINE % (user, entity_name))
+
+    def _walk(self, out: TextIO, entity_name: str, max_depth: int, attribute: str,
+              defined_nodes: Set[str], drawn_from: Set[str]) -> Set[str]:
         """
-        Add entities that use this entity to the diagram.
+        Add the entities reachable through one kind of relationship to the diagram.
+
+        The graph is walked breadth-first and each entity is expanded at most once,
+        at its shortest distance from the starting entity, so entities shared by
+        several paths are not traversed again. Expanding an entity draws all of its
+        edges of that kind, so a walk never draws the same edge twice and only
+        edges already drawn by the dependencies walk need to be skipped.
 
         Args:
-            lines: The list of lines to add to.
-            entity_name: The name of the entity to add used_by for.
-            max_depth: The maximum depth of used_by to include.
-            visited_edges: A set of already visited entity pairs (edges) to avoid cycles.
+            out: The stream to write diagram lines to.
+            entity_name: The name of the entity to start from.
+            max_depth: The maximum depth of relationships to include.
+            attribute: 'dependencies' to follow dependencies, or 'used_by' to follow
+                the entities using each entity (edges then point towards it).
             defined_nodes: A set of entity IDs that have already been defined in the diagram.
-        """
-        if max_depth <= 0 or entity_name not in self.entities:
-            return
-        
-        self._define_node_if_not_exists(lines, entity_name, defined_nodes)
+            drawn_from: The entities whose dependency edges have already been drawn.
 
-        entity = self.entities[entity_name]
-
-        for user_name in entity.used_by:
-            if user_name in self.entities:
-                self._define_node_if_not_exists(lines, user_name, defined_nodes)
-
-                if (user_name, entity_name) not in visited_edges:
-                    visited_edges.add((user_name, entity_name))
-                    lines.append(f"    {user_name} --> {entity_name}")
-                    self._add_used_by(lines, user_name, max_depth - 1, visited_edges, defined_nodes)
+        Returns:
+            The entities expanded by this walk.
+        """
+        entities = self.entities
+        reverse = attribute == 'used_by'
+        write = out.write
+        visited_nodes = {entity_name}
+        expanded = set()
+        queue = deque([(entity_name, 0)])
+
+        while queue:
+            name, distance = queue.popleft()
+            entity = entities.get(name)
+            if distance >= max_depth or entity is None:
+                continue
+
+            self._define_node_if_not_exists(out, name, defined_nodes)
+            expanded.add(name)
+
+            for neighbor in getattr(entity, attribute):
+                neighbor_entity = entities.get(neighbor)
+                if neighbor_entity is None:
+                    continue
+                self._define_node_if_not_exists(out, neighbor, defined_nodes)
+
+                if not reverse:
+                    write(_EDGE_LINE % (name, neighbor))
+                elif neighbor not in drawn_from or name not in neighbor_entity.dependencies:
+                    write(_EDGE_LINE % (neighbor, name))
+
+                if neighbor not in visited_nodes:
+                    visited_nodes.add(neighbor)
+                    queue.append((neighbor, distance + 1))
+
+        return expanded
@@ -1,7 +1,14 @@
-from typing import List, Set
+import sys
+from typing import AbstractSet, Dict, List, Tuple
 
 from generator.base import DiagramGenerator
 
+# Memoized subtree: the slice of diagram lines it occupies, the names checked
+# against the path while building it, and which of those were on the path.
+_Subtree = Tuple[int, int, AbstractSet[str], AbstractSet[str]]
+
+_NOTHING_CHECKED: AbstractSet[str] = frozenset()
+
 
 class TextGenerator(DiagramGenerator):
     """
@@ -21,6 +28,9 @@ class TextGenerator(DiagramGenerator):
         Returns:
             The generated text diagram as a string.
         """
+        # The name is used as a path and memo key; interned like the entity names
+        # it is compared with, equal names are found by identity
+        entity_name = sys.intern(entity_name)
         if entity_name not in self.entities:
             return f"Entity '{entity_name}' not found"
 
@@ -28,68 +38,88 @@ class TextGenerator(DiagramGenerator):
 
         # Add dependencies
         lines.append("\nDependencies:")
-        self._add_dependencies(lines, entity_name, depth, 0, set())
+        self._add_tree(lines, entity_name, 'dependencies', depth)
 
         # Add entities that use this entity
         lines.append("\nUsed by:")
-        self._add_used_by(lines, entity_name, depth, 0, set())
+        self._add_tree(lines, entity_name, 'used_by', depth)
 
         return "\n".join(lines)
 
-    def _add_dependencies(self, lines: List[str], entity_name: str, max_depth: int, 
-                         current_depth: int, visited: Set[str]):
-        """
-        Add dependencies to the diagram.
-
-        Args:
-            lines: The list of lines to add to.
-            entity_name: The name of the entity to add dependencies for.
-            max_depth: The maximum depth of dependencies to include.
-            current_depth: The current depth in the dependency tree.
-            visited: A set of already visited entities to avoid cycles.
+    def _add_tree(self, lines: List[str], entity_name: str, attribute: str, max_depth: int):
         """
-        if entity_name in visited or current_depth >= max_depth:
-            return
-
-        visited.add(entity_name)
+        Add the tree of entities related to an entity to the diagram.
 
-        if entity_name not in self.entities:
-            return
-
-        entity = self.entities[entity_name]
-        indent = "  " * current_depth
-
-        for dep in entity.dependencies:
-            if dep in self.entities:
-                dep_entity = self.entities[dep]
-                lines.append(f"{indent}- {dep_entity.type} {dep}")
-                self._add_dependencies(lines, dep, max_depth, current_depth + 1, visited.copy())
+        The tree is walked depth-first from an explicit stack of frames, each
+        holding an entity and an iterator over its remaining relationships. An
+        entity already on the path from the root is listed but not expanded,
+        which stops cycles.
 
-    def _add_used_by(self, lines: List[str], entity_name: str, max_depth: int, 
-                    current_depth: int, visited: Set[str]):
-        """
-        Add entities that use this entity to the diagram.
+        The same entity can be reached through several paths, so the lines added
+        for each (entity, depth) are memoized. Within one tree a given depth always
+        has the same indentation, so a memoized slice of lines can be copied as is.
+        It is reused when the entities it checked against the path are on the
+        current path exactly when they were on the original one, which guarantees
+        it would be built identically.
 
         Args:
             lines: The list of lines to add to.
-            entity_name: The name of the entity to add used_by for.
-            max_depth: The maximum depth of used_by to include.
-            current_depth: The current depth in the used_by tree.
-            visited: A set of already visited entities to avoid cycles.
+            entity_name: The name of the entity at the root of the tree.
+            attribute: 'dependencies' or 'used_by', the relationship to follow.
+            max_depth: The maximum depth of the tree.
         """
-        if entity_name in visited or current_depth >= max_depth:
+        entities = self.entities
+        related_names = getattr(entities[entity_name], attribute)
+        if max_depth <= 0 or not related_names:
             return
 
-        visited.add(entity_name)
-
-        if entity_name not in self.entities:
+        if max_depth == 1:
+            # Only the direct relationships are listed, none is expanded
+            for related in related_names:
+                related_entity = entities.get(related)
+                if related_entity is not None:
+                    lines.append(f"- {related_entity.type} {related}")
             return
 
-        entity = self.entities[entity_name]
-        indent = "  " * current_depth
-
-        for used_by in entity.used_by:
-            if used_by in self.entities:
-                used_by_entity = self.entities[used_by]
-                lines.append(f"{indent}- {used_by_entity.type} {used_by}")
-                self._add_used_by(lines, used_by, max_depth, current_depth + 1, visited.copy())
+        path = {entity_name}
+        memo: Dict[Tuple[str, int], _Subtree] = {}
+        # Frames of [entity name, relationship iterator, depth, first line, names checked against the path]
+        stack = [[entity_name, iter(related_names), 0, len(lines), set()]]
+
+        while stack:
+            frame = stack[-1]
+            name, related_names, depth, start, checked = frame
+            related = next(related_names, None)
+
+            if related is None:
+                # All relationships listed: memoize the subtree and return to the parent
+                stack.pop()
+                path.discard(name)
+                on_path = {n for n in path if n in checked} if checked else _NOTHING_CHECKED
+                memo[(name, depth)] = (start, len(lines), checked, on_path)
+                if stack:
+                    stack[-1][4] |= checked
+                continue
+
+            related_entity = entities.get(related)
+            if related_entity is None:
+                continue
+            lines.append(f"{'  ' * depth}- {related_entity.type} {related}")
+
+            child_depth = depth + 1
+            if child_depth >= max_depth:
+                continue
+            checked.add(related)
+            if related in path:
+                continue
+
+            path.add(related)
+            cached = memo.get((related, child_depth))
+            if cached is not None:
+                cached_start, cached_end, cached_checked, cached_on_path = cached
+                if not cached_checked or {n for n in path if n in cached_checked} == cached_on_path:
+                    lines.extend(lines[cached_start:cached_end])
+                    path.discard(related)
+                    checked |= cached_checked
+                    continue
+            stack.append([related, iter(getattr(related_entity, attribute)), child_depth, len(lines), set()])
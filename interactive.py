@@ -0,0 +1,181 @@
+"""Interactive mode for diagrams.
+
+This module prompts for the directory, entity, format and depth of a diagram,
+with completion of entity names. It is imported only when interactive mode runs.
+"""
+import sys
+from bisect import bisect_left
+from typing import Dict, Tuple
+
+from prompt_toolkit import prompt
+from prompt_toolkit.completion import Completer, Completion
+from prompt_toolkit.formatted_text import HTML
+
+from constants import GeneratorType
+from core import generate_diagram, load_entities
+
+
+class EntityCompleter(Completer):
+    """Completer for entity names with file information."""
+
+    def __init__(self, entities: Dict[str, 'Entity']):
+        self.entities = entities
+        self.entity_names = list(entities.keys())
+        # Lowercased names in sorted order, so the names starting with a prefix
+        # form a contiguous range found by bisection instead of a full scan.
+        index = sorted((entity_name.lower(), entity_name) for entity_name in self.entity_names)
+        self._lowered_names = [lowered for lowered, _ in index]
+        self._sorted_names = [entity_name for _, entity_name in index]
+        # Per-entity (display suffix, display meta), built the first time an entity is suggested
+        self._details: Dict[str, Tuple[str, str]] = {}
+
+    def get_completions(self, document, complete_event):
+        word_before_cursor = document.get_word_before_cursor()
+
+        # If word_before_cursor is empty, do not proceed.
+        if not word_before_cursor:
+            return
+
+        word_lower = word_before_cursor.lower()
+        lowered_names = self._lowered_names
+
+        for i in range(bisect_left(lowered_names, word_lower), len(lowered_names)):
+            if not lowered_names[i].startswith(word_lower):
+                break
+            entity_name = self._sorted_names[i]
+
+            # Construct the main part of the display text for the suggestion.
+            # This ensures that the displayed suggestion starts with the exact characters typed by the user (case-preserved),
+            # followed by the rest of the entity name. This helps if prompt-toolkit performs
+            # a case-sensitive match of the typed word against the displayed string.
+            # For example, if user types "B" and entity_name is "beta",
+            # displayed_text_main_part becomes "Beta".
+            # If user types "b" and entity_name is "Beta",
+            # displayed_text_main_part becomes "beta".
+            # The actual inserted text upon completion will still be the original `entity_name`.
+
+            # Check if the length of word_before_cursor is not greater than entity_name
+            # This should generally be true if startswith matched, but good for safety.
+            if len(word_before_cursor) <= len(entity_name):
+                # Ensure the prefix matches case-insensitively before reconstructing.
+                # This handles cases like word="Foo", entity_name="foobar" -> display "Foobar"
+                # And word="foo", entity_name="Foobar" -> display "foobar"
+                if entity_name[:len(word_before_cursor)].lower() == word_lower:
+                    displayed_text_main_part = word_before_cursor + entity_name[len(word_before_cursor):]
+                else:
+                    # This case should ideally not be hit if entity_name.lower().startswith(word_lower) is true
+                    # and both are simple strings. However, as a fallback, use entity_name.
+                    displayed_text_main_part = entity_name
+            else:
+                # Fallback if word_before_cursor is somehow longer than entity_name (should not happen here)
+                displayed_text_main_part = entity_name
+
+            details = self._details.get(entity_name)
+            if details is None:
+                entity = self.entities[entity_name]
+                details = (f' ({entity.type} in <i>{entity.file_path.name}</i>)', str(entity.file_path))
+                self._details[entity_name] = details
+            display_suffix, display_meta = details
+
+            display_text = HTML(f'<b>{displayed_text_main_part}</b>{display_suffix}')
+
+            yield Completion(
+                entity_name,  # Actual text to insert is the original entity_name
+                start_position=-len(word_before_cursor),
+                display=display_text,  # Displayed text in the menu
+                display_meta=display_meta
+            )
+
+
+class FormatCompleter(Completer):
+    """Completer for format selection."""
+
+    def __init__(self, formats):
+        self.formats = formats
+
+    def get_completions(self, document, complete_event):
+        word = document.get_word_before_cursor()
+        for format_type in self.formats:
+            if word.lower() in format_type.lower():
+                display_text = HTML(f'<b>{format_type}</b>')
+                yield Completion(
+                    format_type,
+                    start_position=-len(word),
+                    display=display_text
+                )
+
+
+def interactive_mode(cache: bool = True):
+    """
+    Run the diagrams tool in interactive mode.
+
+    Args:
+        cache: Whether to use the parse cache when loading the entities.
+    """
+
+    # Ask for directory
+    directory = prompt("Enter directory to scan for Python files: ", default=".")
+
+    # Scan and parse the files once; the diagram is generated from the same entities
+    entities = load_entities(directory, cache)
+
+    if not entities:
+        print("No entities found in the specified directory.")
+        return 1
+
+    # Ask for entity with autocomplete
+    entity_completer = EntityCompleter(entities)
+    entity = prompt(
+        "Select entity to generate diagram for: ",
+        completer=entity_completer,
+    )
+
+    if not entity or entity not in entities:
+        print(f"Entity '{entity}' not found.")
+        return 1
+
+    # Ask for format with a simple selection
+    format_choices = GeneratorType.get_options()
+    # Create a list of options with indices
+    options = [f"{i+1}. {format_choice}" for i, format_choice in enumerate(format_choices)]
+    print("\nAvailable output formats:")
+    print("\n".join(options))
+    
+    while True:
+        selection = prompt("Select format (enter number): ")
+        try:
+            index = int(selection) - 1
+            if 0 <= index < len(format_choices):
+                format_type = format_choices[index]
+                break
+            else:
+                print(f"Please enter a number between 1 and {len(format_choices)}")
+        except ValueError:
+            # Also allow direct format name entry
+            if selection in format_choices:
+                format_type = selection
+                break
+            print("Please enter a valid number or format name")
+
+    # Ask for depth
+    depth_str = prompt("Enter maximum depth of dependencies (default: 4): ", default="4")
+    try:
+        depth = int(depth_str)
+    except ValueError:
+        print(f"Invalid depth: {depth_str}")
+        return 1
+
+    # Ask for output file
+    output = prompt("Enter output file path (leave empty for stdout): ", default="")
+    if not output:
+        output = None
+
+    # Generate the diagram
+    try:
+        generate_diagram(directory, entity, format_type, depth, output, entities)
+        print(f"Diagram generated successfully{' and saved to ' + output if output else ''}.")
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    return 0
@@ -1,19 +1,36 @@
 """Tests for the diagrams package."""
 
+import json
 import os
+import pickle
+import sys
 import tempfile
 from pathlib import Path
 from unittest.mock import mock_open, patch
 
+import pytest
+from prompt_toolkit.document import Document
+
+from analyzer.cache import EMPTY_KEY, SYNTAX_ERROR_KEY, ParseCache, user_cache_dir
 from analyzer.entity import Entity
-from analyzer.parser import CodeParser
+from analyzer.parser import CodeParser, extract_source
 from analyzer.scanner import FileScanner
-from core import generate_diagram
+from core import generate_diagram, load_entities
+from generator.ascii_generator import ASCIIDiagramGenerator
 from generator.mermaid_generator import MermaidDiagramGenerator
 from generator.text_generator import TextGenerator
+from interactive import EntityCompleter
 from main import main
 
 
+@pytest.fixture(autouse=True)
+def user_cache(tmp_path, monkeypatch):
+    """Keep the caches written by the tests out of the real user cache directory."""
+    cache_home = tmp_path / "cache-home"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+    return cache_home
+
+
 class TestFileScanner:
     """Tests for the FileScanner class."""
 
@@ -67,6 +84,53 @@ class TestFileScanner:
             # Check that the excluded file was not found
             assert Path(os.path.join(temp_dir, ".git", "file4.py")) not in python_files
 
+    def test_scan_directory_does_not_follow_symlinked_dirs(self):
+        """Test that symbolic links to directories are not descended into."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "real"))
+            with open(os.path.join(temp_dir, "real", "module.py"), "w") as f:
+                f.write("# Real module")
+            os.symlink(os.path.join(temp_dir, "real"), os.path.join(temp_dir, "link"))
+
+            python_files = FileScanner().scan_directory(temp_dir)
+
+            assert python_files == [Path(os.path.join(temp_dir, "real", "module.py"))]
+
+    def test_scan_directory_skips_symlinked_dir_named_like_module(self):
+        """Test that a symbolic link to a directory is not taken for a Python file."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "real"))
+            with open(os.path.join(temp_dir, "real", "module.py"), "w") as f:
+                f.write("# Real module")
+            os.symlink(os.path.join(temp_dir, "real"), os.path.join(temp_dir, "link.py"))
+            os.symlink(os.path.join(temp_dir, "real", "module.py"), os.path.join(temp_dir, "alias.py"))
+
+            python_files = FileScanner().scan_directory(temp_dir)
+
+            assert sorted(python_files) == [Path(os.path.join(temp_dir, "alias.py")),
+                                            Path(os.path.join(temp_dir, "real", "module.py"))]
+
+    def test_scan_directory_threaded_matches_serial(self):
+        """Test that the threaded scan finds the same files as a serial scan."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i in range(3):
+                nested = os.path.join(temp_dir, f"pkg{i}", "sub")
+                os.makedirs(nested)
+                for directory in (os.path.dirname(nested), nested):
+                    with open(os.path.join(directory, "module.py"), "w") as f:
+                        f.write("# Module")
+
+            threaded = FileScanner(max_workers=4).scan_directory(temp_dir)
+            serial = FileScanner(max_workers=1).scan_directory(temp_dir)
+
+            assert len(threaded) == 6
+            assert threaded == serial
+
+    def test_scan_missing_directory(self):
+        """Test that scanning a missing directory finds nothing."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            assert FileScanner().scan_directory(os.path.join(temp_dir, "missing")) == []
+
 
 class TestEntity:
     """Tests for the Entity class."""
@@ -104,6 +168,15 @@ class TestEntity:
         entity = Entity("TestEntity", "class", Path("test.py"), 10)
         assert str(entity) == "class TestEntity (test.py:10)"
 
+    def test_unpickled_names_are_interned(self):
+        """Test that an entity unpickled from a worker process keeps interned names."""
+        entity = Entity("TestEntity", "class", Path("test.py"), 10)
+        entity.add_dependency("Base")
+        restored = pickle.loads(pickle.dumps(entity))
+        assert restored.name is sys.intern("TestEntity")
+        assert next(iter(restored.dependencies)) is sys.intern("Base")
+        assert (restored.file_path, restored.line_number) == (Path("test.py"), 10)
+
 
 class TestCodeParser:
     """Tests for the CodeParser class."""
@@ -116,7 +189,7 @@ class TestCodeParser:
     @patch(
         "builtins.open",
         new_callable=mock_open,
-        read_data="""
+        read_data=b"""
 class TestClass:
     def __init__(self):
         pass
@@ -141,7 +214,7 @@ def test_function():
     @patch(
         "builtins.open",
         new_callable=mock_open,
-        read_data="""
+        read_data=b"""
 class BaseClass:
     pass
 
@@ -168,6 +241,298 @@ def called_function():
         # Function call relationships can't be tested easily with mock data
         # because the AST doesn't have parent information in this context
 
+    def test_parse_file_scope_tracking(self):
+        """Test that calls are attributed to the innermost enclosing entity."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir, "scopes.py")
+            path.write_text(
+                "class Owner:\n"
+                "    def method(self):\n"
+                "        helper()\n"
+                "        def nested():\n"
+                "            other()\n"
+                "\n"
+                "def helper():\n"
+                "    pass\n"
+                "\n"
+                "def other():\n"
+                "    pass\n"
+            )
+
+            parser = CodeParser()
+            parser.parse_file(path)
+
+            assert "method" not in parser.entities
+            assert parser.entities["Owner"].dependencies == {"helper"}
+            assert parser.entities["nested"].dependencies == {"other"}
+            assert parser.entities["other"].used_by == {"nested"}
+
+    @patch("analyzer.parser.ast.parse")
+    def test_parse_file_skips_files_without_definitions(self, mock_parse):
+        """Test that files with no class or def keyword are not parsed."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir, "__init__.py")
+            path.write_text("from .module import name\n__all__ = ['name']\n")
+
+            parser = CodeParser()
+            parser.parse_file(path)
+
+            assert parser.entities == {}
+            mock_parse.assert_not_called()
+
+    def test_parse_files_cross_file_relationships(self):
+        """Test that calls into files parsed later are still linked."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            caller = Path(temp_dir, "a_caller.py")
+            caller.write_text("def caller_function():\n    called_function()\n")
+            called = Path(temp_dir, "b_called.py")
+            called.write_text("def called_function():\n    pass\n")
+
+            parser = CodeParser()
+            parser.parse_files([caller, called])
+
+            assert "called_function" in parser.entities["caller_function"].dependencies
+            assert "caller_function" in parser.entities["called_function"].used_by
+
+    @patch("analyzer.parser.MIN_FILES_FOR_POOL", 1)
+    def test_parse_files_process_pool(self):
+        """Test that parsing in worker processes gives the same result as serial parsing."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = []
+            for i in range(4):
+                path = Path(temp_dir, f"module{i}.py")
+                path.write_text(f"class Class{i}:\n    def run(self):\n        helper{i}()\n\n"
+                                f"def helper{i}():\n    pass\n")
+                paths.append(path)
+
+            pooled = CodeParser(max_workers=2)
+            pooled.parse_files(paths)
+            serial = CodeParser(max_workers=1)
+            serial.parse_files(paths)
+
+            assert set(pooled.entities) == set(serial.entities)
+            for name, entity in serial.entities.items():
+                assert pooled.entities[name].dependencies == entity.dependencies
+                assert pooled.entities[name].used_by == entity.used_by
+            assert "helper2" in pooled.entities["Class2"].dependencies
+
+
+class TestParseCache:
+    """Tests for the ParseCache class."""
+
+    def test_round_trip(self):
+        """Test that an extraction is stored and given to the file reading it back."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ParseCache(Path(temp_dir))
+            source = b"def cached_function():\n    helper()\n"
+            key = cache.key(source)
+
+            cache.put(key, extract_source(source, Path("first.py")))
+            assert (Path(temp_dir) / f"{key}.pkl").exists()
+
+            entities, edges = cache.get(key, Path("second.py"))
+            assert [(entity.name, entity.file_path) for entity in entities] == [
+                ("cached_function", Path("second.py"))]
+            assert edges == [("cached_function", "helper")]
+
+    def test_key_depends_on_source(self):
+        """Test that different source produces different keys."""
+        cache = ParseCache(Path("unused"))
+        assert cache.key(b"a = 1") != cache.key(b"a = 2")
+
+    def test_corrupt_entry_is_a_miss(self):
+        """Test that a damaged cache entry is ignored and the file extracted again."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir, "module.py")
+            path.write_text("class Damaged:\n    pass\n")
+            cache = ParseCache(Path(temp_dir, "cache"))
+            entry = Path(temp_dir, "cache", f"{cache.key(path.read_bytes())}.pkl")
+            entry.parent.mkdir()
+
+            valid = pickle.dumps(extract_source(path.read_bytes(), path))
+            for data in (b"not a pickle", valid[:len(valid) // 2], pickle.dumps(1)):
+                entry.write_bytes(data)
+                assert cache.get(entry.stem, path) is None
+                entities, _ = ParseCache(entry.parent).parse_file(path, extract_source)
+                assert [entity.name for entity in entities] == ["Damaged"]
+
+    def test_parser_uses_cache(self):
+        """Test that CodeParser gives the same entities with a warm cache."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir, "module.py")
+            path.write_text("class Cached:\n    pass\n")
+            cache_dir = Path(temp_dir, "cache")
+
+            CodeParser(cache_dir=cache_dir).parse_files([path])
+            assert any(cache_dir.glob("*.pkl"))
+
+            parser = CodeParser(cache_dir=cache_dir)
+            with patch("analyzer.parser.ast.parse") as mock_parse:
+                parser.parse_files([path])
+            mock_parse.assert_not_called()
+            assert parser.entities["Cached"].file_path == path
+
+    def test_index_tracks_unchanged_files(self):
+        """Test that parsed files are indexed by mtime and size and re-read when changed."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir, "module.py")
+            path.write_text("class First:\n    pass\n")
+            cache_dir = Path(temp_dir, "cache")
+
+            cache = ParseCache(cache_dir)
+            cache.parse_file(path, extract_source)
+            cache.save_index()
+            assert (cache_dir / "index.json").exists()
+
+            reloaded = ParseCache(cache_dir)
+            stat = path.stat()
+            assert reloaded.index[os.path.realpath(path)][:2] == (stat.st_mtime_ns, stat.st_size)
+            assert not reloaded.seen
+
+            path.write_text("class Second:\n    pass\n\nclass Third:\n    pass\n")
+            entities, _ = reloaded.parse_file(path, extract_source)
+            assert [entity.name for entity in entities] == ["Second", "Third"]
+            assert reloaded.seen[os.path.realpath(path)] != reloaded.index[os.path.realpath(path)]
+
+    @patch("analyzer.parser.MIN_FILES_FOR_POOL", 1)
+    def test_pool_workers_report_index_entries(self):
+        """Test that index entries recorded in worker processes are saved by the parser."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = []
+            for i in range(3):
+                path = Path(temp_dir, f"module{i}.py")
+                path.write_text(f"def function{i}():\n    pass\n")
+                paths.append(path)
+            cache_dir = Path(temp_dir, "cache")
+
+            CodeParser(max_workers=2, cache_dir=cache_dir).parse_files(paths)
+
+            assert set(ParseCache(cache_dir).index) == {os.path.realpath(path) for path in paths}
+
+    def test_malformed_index_is_ignored(self):
+        """Test that malformed index contents are dropped instead of failing lookups."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir, "module.py")
+            path.write_text("class Indexed:\n    pass\n")
+            cache_dir = Path(temp_dir, "cache")
+            cache = ParseCache(cache_dir)
+            cache.parse_file(path, extract_source)
+            cache.save_index()
+            index_file = cache_dir / "index.json"
+            data = json.loads(index_file.read_text())
+            good_entry = data["files"][os.path.realpath(path)]
+
+            for files in ([], {"a.py": [1, 2]}, {"a.py": "bad"}, {"a.py": [1, "2", "key"]}):
+                data["files"] = files
+                index_file.write_text(json.dumps(data))
+                assert ParseCache(cache_dir).index == {}
+
+            data["files"] = {os.path.realpath(path): good_entry, "a.py": [1, 2]}
+            index_file.write_text(json.dumps(data))
+            reloaded = ParseCache(cache_dir)
+            assert list(reloaded.index) == [os.path.realpath(path)]
+            entities, _ = reloaded.parse_file(path, extract_source)
+            assert [entity.name for entity in entities] == ["Indexed"]
+
+    def test_index_shared_by_relative_and_absolute_paths(self, monkeypatch):
+        """Test that a file is indexed once whether reached by a relative or absolute path."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir, "module.py")
+            path.write_text("class Indexed:\n    pass\n")
+            cache = ParseCache(Path(temp_dir, "cache"))
+
+            monkeypatch.chdir(temp_dir)
+            cache.parse_file(Path("module.py"), extract_source)
+            cache.parse_file(path, extract_source)
+            assert list(cache.take_seen()) == [os.path.realpath(path)]
+
+    def test_user_cache_dir_is_outside_project(self, user_cache):
+        """Test that projects are cached per user, by resolved path."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_dir = user_cache_dir(temp_dir)
+            assert user_cache in cache_dir.parents
+            assert user_cache_dir(os.path.join(temp_dir, ".")) == cache_dir
+            assert user_cache_dir(os.path.join(temp_dir, "other")) != cache_dir
+
+    def test_load_entities_without_cache(self, user_cache):
+        """Test that the cache can be turned off."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with open(os.path.join(temp_dir, "module.py"), "w") as f:
+                f.write("class Uncached:\n    pass\n")
+
+            assert "Uncached" in load_entities(temp_dir, cache=False)
+            assert not user_cache.exists()
+
+    def test_load_entities_writes_nothing_to_project(self, user_cache):
+        """Test that scanning a project leaves its directory untouched."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with open(os.path.join(temp_dir, "module.py"), "w") as f:
+                f.write("class Cached:\n    pass\n")
+
+            assert "Cached" in load_entities(temp_dir)
+            assert os.listdir(temp_dir) == ["module.py"]
+            assert any(user_cache_dir(temp_dir).glob("*.pkl"))
+
+    def test_save_index_evicts_unreferenced_entries(self):
+        """Test that entries of replaced sources are deleted when the index is saved."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir, "module.py")
+            path.write_text("class First:\n    pass\n")
+            cache_dir = Path(temp_dir, "cache")
+
+            cache = ParseCache(cache_dir)
+            cache.parse_file(path, extract_source)
+            cache.save_index()
+            first_key = cache.index[os.path.realpath(path)][2]
+
+            path.write_text("class Second:\n    pass\n")
+            os.utime(path, ns=(0, 0))
+            cache.parse_file(path, extract_source)
+            cache.save_index()
+
+            assert not (cache_dir / f"{first_key}.pkl").exists()
+            assert [entry.name for entry in cache_dir.glob("*.pkl")] == [f"{cache.index[os.path.realpath(path)][2]}.pkl"]
+
+    def test_parse_files_prunes_missing_files(self):
+        """Test that files deleted since the last run leave the index and their entries are deleted."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            kept = Path(temp_dir, "kept.py")
+            kept.write_text("class Kept:\n    pass\n")
+            deleted = Path(temp_dir, "deleted.py")
+            deleted.write_text("class Deleted:\n    pass\n")
+            cache_dir = Path(temp_dir, "cache")
+
+            CodeParser(cache_dir=cache_dir).parse_files([kept, deleted])
+            assert len(list(cache_dir.glob("*.pkl"))) == 2
+
+            deleted.unlink()
+            CodeParser(cache_dir=cache_dir).parse_files([kept])
+
+            index = ParseCache(cache_dir).index
+            assert list(index) == [os.path.realpath(kept)]
+            assert [entry.name for entry in cache_dir.glob("*.pkl")] == [f"{index[os.path.realpath(kept)][2]}.pkl"]
+
+    def test_files_without_entities_are_indexed(self):
+        """Test that files defining nothing or failing to parse are indexed and not read again."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            empty = Path(temp_dir, "empty.py")
+            empty.write_text("x = 1\n")
+            broken = Path(temp_dir, "broken.py")
+            broken.write_text("def broken(:\n")
+            cache_dir = Path(temp_dir, "cache")
+
+            CodeParser(cache_dir=cache_dir).parse_files([empty, broken])
+            index = ParseCache(cache_dir).index
+            assert index[os.path.realpath(empty)][2] == EMPTY_KEY
+            assert index[os.path.realpath(broken)][2] == SYNTAX_ERROR_KEY
+            assert not any(cache_dir.glob("*.pkl"))
+
+            parser = CodeParser(cache_dir=cache_dir)
+            with patch("analyzer.cache.open", side_effect=AssertionError, create=True):
+                parser.parse_files([empty, broken])
+            assert not parser.entities
+            assert set(ParseCache(cache_dir).index) == set(index)
+
 
 class TestTextGenerator:
     """Tests for the TextGenerator class."""
@@ -214,6 +579,20 @@ class TestTextGenerator:
         assert "Used by:" in diagram
         assert "- class Entity2" in diagram
 
+    def test_generate_shared_subtree_and_cycle(self):
+        """Test that a subtree reached twice is repeated and cycles are not expanded."""
+        entities = {name: Entity(name, "function", Path("test.py"), 1) for name in "ABCD"}
+        for source, target in [("A", "B"), ("A", "C"), ("B", "D"), ("C", "D"), ("D", "A")]:
+            entities[source].add_dependency(target)
+            entities[target].add_used_by(source)
+
+        diagram = TextGenerator(entities).generate("A", 4)
+        dependencies = diagram.split("Used by:")[0]
+
+        assert dependencies.count("  - function D") == 2
+        assert dependencies.count("    - function A") == 2
+        assert "      - function" not in dependencies
+
 
 class TestMermaidDiagramGenerator:
     """Tests for the MermaidDiagramGenerator class."""
@@ -267,10 +646,69 @@ class TestMermaidDiagramGenerator:
         assert "Entity2((Entity2))" in diagram
         assert "```" in diagram
 
+    def test_node_lines_reset_with_entities(self):
+        """Test that cached node lines are dropped when the entities are replaced."""
+        generator = MermaidDiagramGenerator({"Entity1": Entity("Entity1", "class", Path("test.py"), 10)})
+        assert "Entity1[[Entity1]]" in generator.generate("Entity1")
+
+        generator.entities = {"Entity1": Entity("Entity1", "function", Path("test.py"), 10)}
+        diagram = generator.generate("Entity1")
+
+        assert "Entity1((Entity1))" in diagram
+        assert "Entity1[[Entity1]]" not in diagram
+
+    def test_generate_recursive_entity(self):
+        """Test that an entity using itself gets a single edge at each depth."""
+        entity = Entity("Entity1", "function", Path("test.py"), 10)
+        entity.add_dependency("Entity1")
+        entity.add_used_by("Entity1")
+        generator = MermaidDiagramGenerator({"Entity1": entity})
+
+        for depth in (1, 2):
+            assert generator.generate("Entity1", depth).count("Entity1 --> Entity1") == 1
+
+
+class TestASCIIDiagramGenerator:
+    """Tests for the ASCIIDiagramGenerator class."""
+
+    def test_generate_entity_not_found(self):
+        """Test generating a diagram for a non-existent entity."""
+        generator = ASCIIDiagramGenerator({})
+        diagram = generator.generate("NonExistentEntity")
+        assert "Entity 'NonExistentEntity' not found" in diagram
+
+    def test_generate_isolated_entity(self):
+        """Test generating a diagram for an entity with no relationships."""
+        entity = Entity("TestEntity", "class", Path("test.py"), 10)
+        generator = ASCIIDiagramGenerator({"TestEntity": entity})
+        diagram = generator.generate("TestEntity")
+
+        assert diagram == (
+            "ASCII Diagram for TestEntity (depth 1):\n"
+            "=======================================\n"
+            "\n"
+            "+--------------------+\n"
+            "| TestEntity (class) |\n"
+            "+--------------------+"
+        )
+
+    def test_generate_with_dependencies(self):
+        """Test generating a diagram for an entity with dependencies."""
+        entity1 = Entity("Entity1", "class", Path("test.py"), 10)
+        entity2 = Entity("Entity2", "function", Path("test.py"), 20)
+        entity1.add_dependency("Entity2")
+        entity2.add_used_by("Entity1")
+
+        generator = ASCIIDiagramGenerator({"Entity1": entity1, "Entity2": entity2})
+        diagram = generator.generate("Entity1")
+
+        assert "| Entity1 (class) |" in diagram
+        assert "---->| Entity2 (function) |" in diagram
+
 
 @patch("core.FileScanner")
 @patch("core.CodeParser")
-@patch("core.TextGenerator")
+@patch("generator.text_generator.TextGenerator")
 @patch("builtins.open", new_callable=mock_open)
 def test_generate_diagram_ascii(
     mock_file, mock_text_generator, mock_parser, mock_scanner
@@ -286,7 +724,6 @@ def test_generate_diagram_ascii(
     }
 
     mock_generator_instance = mock_text_generator.return_value
-    mock_generator_instance.generate.return_value = "List Diagram"
 
     # Call the function
     generate_diagram("test_dir", "TestEntity", "text", 1, "output.txt")
@@ -299,15 +736,14 @@ def test_generate_diagram_ascii(
     mock_parser_instance.parse_files.assert_called_once_with([Path("test.py")])
 
     mock_text_generator.assert_called_once_with(mock_parser_instance.entities)
-    mock_generator_instance.generate.assert_called_once_with("TestEntity", 1)
 
     mock_file.assert_called_once_with("output.txt", "w", encoding="utf-8")
-    mock_file().write.assert_called_once_with("List Diagram")
+    mock_generator_instance.generate_into.assert_called_once_with(mock_file(), "TestEntity", 1)
 
 
 @patch("core.FileScanner")
 @patch("core.CodeParser")
-@patch("core.MermaidDiagramGenerator")
+@patch("generator.mermaid_generator.MermaidDiagramGenerator")
 @patch("builtins.open", new_callable=mock_open)
 def test_generate_diagram_mermaid(
     mock_file, mock_mermaid_generator, mock_parser, mock_scanner
@@ -323,7 +759,6 @@ def test_generate_diagram_mermaid(
     }
 
     mock_generator_instance = mock_mermaid_generator.return_value
-    mock_generator_instance.generate.return_value = "Mermaid Diagram"
 
     # Call the function
     generate_diagram("test_dir", "TestEntity", "mermaid", 1, "output.txt")
@@ -336,10 +771,60 @@ def test_generate_diagram_mermaid(
     mock_parser_instance.parse_files.assert_called_once_with([Path("test.py")])
 
     mock_mermaid_generator.assert_called_once_with(mock_parser_instance.entities)
-    mock_generator_instance.generate.assert_called_once_with("TestEntity", 1)
 
     mock_file.assert_called_once_with("output.txt", "w", encoding="utf-8")
-    mock_file().write.assert_called_once_with("Mermaid Diagram")
+    mock_generator_instance.generate_into.assert_called_once_with(mock_file(), "TestEntity", 1)
+
+
+def test_generate_diagram_stdout(capsys):
+    """Test that a diagram written to stdout matches the generated string."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with open(os.path.join(temp_dir, "module.py"), "w") as f:
+            f.write("class Base:\n    pass\n\nclass Child(Base):\n    pass\n")
+
+        generate_diagram(temp_dir, "Child", "mermaid", 1)
+
+        entities = load_entities(temp_dir)
+        expected = MermaidDiagramGenerator(entities).generate("Child", 1)
+        assert capsys.readouterr().out == expected + "\n"
+
+
+def test_generate_diagram_unsupported_format():
+    """Test that an unknown format is rejected before scanning."""
+    with patch("core.FileScanner") as mock_scanner:
+        with pytest.raises(ValueError, match="Unsupported format: svg"):
+            generate_diagram("test_dir", "TestEntity", "svg")
+        mock_scanner.assert_not_called()
+
+
+def test_generate_diagram_with_loaded_entities(capsys):
+    """Test that entities already loaded by a session are not scanned and parsed again."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with open(os.path.join(temp_dir, "module.py"), "w") as f:
+            f.write("def first():\n    pass\n")
+        entities = load_entities(temp_dir)
+
+        with patch("core.FileScanner") as mock_scanner, patch("core.CodeParser") as mock_parser:
+            generate_diagram(temp_dir, "first", "text", 1, entities=entities)
+
+        mock_scanner.assert_not_called()
+        mock_parser.assert_not_called()
+        assert "Text Diagram for first" in capsys.readouterr().out
+
+
+def test_entity_completer_matches_prefix_case_insensitively():
+    """Test that entity completions are the names starting with the typed word."""
+    entities = {
+        name: Entity(name, "class", Path("test.py"), 1)
+        for name in ["beta", "Bar", "baz", "Alpha", "zeta"]
+    }
+    completer = EntityCompleter(entities)
+
+    completions = list(completer.get_completions(Document("Ba"), None))
+
+    assert [c.text for c in completions] == ["Bar", "baz"]
+    assert all(c.start_position == -2 for c in completions)
+    assert list(completer.get_completions(Document("q"), None)) == []
 
 
 @patch("main.generate_diagram")
@@ -348,7 +833,7 @@ def test_main_default_args(mock_generate_diagram):
     """Test the main function with default arguments."""
     main()
     mock_generate_diagram.assert_called_once_with(
-        "test_dir", "TestEntity", "text", 4, None
+        "test_dir", "TestEntity", "text", 4, None, cache=True
     )
 
 
@@ -372,7 +857,17 @@ def test_main_custom_args(mock_generate_diagram):
     """Test the main function with custom arguments."""
     main()
     mock_generate_diagram.assert_called_once_with(
-        "test_dir", "TestEntity", "mermaid", 2, "output.txt"
+        "test_dir", "TestEntity", "mermaid", 2, "output.txt", cache=True
+    )
+
+
+@patch("main.generate_diagram")
+@patch("sys.argv", ["diagrams", "test_dir", "--entity", "TestEntity", "--no-cache"])
+def test_main_no_cache(mock_generate_diagram):
+    """Test that --no-cache turns the parse cache off."""
+    main()
+    mock_generate_diagram.assert_called_once_with(
+        "test_dir", "TestEntity", "text", 4, None, cache=False
     )
 
 